@@ -1,11 +1,25 @@
 import streamlit as st
 from dotenv import load_dotenv
 load_dotenv() # Carga las variables de entorno desde .env
-import neurokit2 as nk
-import matplotlib.pyplot as plt
-import pandas as pd
+import logging
 import numpy as np
+import os
+import sqlite3
+from lazy_imports import importacion_diferida, precargar_en_segundo_plano
+# Dependencias pesadas: se importan en el primer uso en lugar de en cada arranque del script
+nk = importacion_diferida("neurokit2")
+plt = importacion_diferida("matplotlib.pyplot")
+pd = importacion_diferida("pandas")
+import tempfile
+from datetime import datetime
 from io import StringIO
+from ecg_export import FORMATOS_EXPORTACION, exportar_senales, exportar_npz, importar_npz
+from remuestreo import FS_CANONICA, remuestrear, anotaciones_a_origen
+from hrv_movil import VENTANA_S, PASO_S, tendencia_hrv
+from cribado_arritmias import cribar_arritmias
+from cache_compartida import CacheCompartida, hash_contenido
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from historial import LIMITE_PAGINA, obtener_historial
 
 # Configuración de la página de Streamlit
 st.set_page_config(
@@ -14,6 +28,10 @@ st.set_page_config(
     layout="wide" # Utiliza un diseño amplio para mejor visualización
 )
 
+# Precarga las dependencias pesadas en segundo plano (una sola vez por proceso)
+# mientras se dibuja la interfaz
+precargar_en_segundo_plano(["neurokit2", "matplotlib.pyplot", "pandas"])
+
 # CSS personalizado para mejorar la apariencia de la aplicación
 st.markdown("""
 <style>
@@ -49,29 +67,87 @@ with st.sidebar:
     # Opción para elegir la fuente de datos (simulación o archivo)
     option = st.radio("Fuente de datos", ["Simular ECG", "Cargar archivo"], 
                       help="Elige entre simular una señal o cargar datos reales")
+    # Identificador del paciente con el que se guarda el análisis en el historial
+    paciente_id = st.text_input("ID de paciente", help="Opcional. Permite consultar y comparar los análisis anteriores del paciente").strip() or None
+
+# Caché compartida por todas las sesiones del proceso (señales y resultados, indexados por hash del contenido)
+@st.cache_resource
+def obtener_cache():
+    max_mb = float(os.environ.get("ECG_CACHE_MAX_MB", "512"))
+    return CacheCompartida(int(max_mb * 1024 * 1024))
+
+cache = obtener_cache()
+ctx = get_script_run_ctx()
+session_id = ctx.session_id if ctx is not None else None
+# Historial persistente de análisis (SQLite, compartido por todas las sesiones);
+# None si la base de datos no se puede abrir: se analiza igualmente, sin guardar historial
+historial = obtener_historial()
+
+def clave_senal(ecg_signal, sampling_rate):
+    """Hash del registro (señal y frecuencia de muestreo) usado por la caché y el historial."""
+    return hash_contenido("process_ecg", ecg_signal, sampling_rate, FS_CANONICA)
 
 # Función para procesar la señal ECG
-@st.cache_data # Cachea los resultados para evitar reprocesar si los inputs no cambian
-def process_ecg(ecg_signal, sampling_rate):
+def process_ecg(ecg_signal, sampling_rate, hash_registro=None):
     """
     Procesa la señal ECG y extrae métricas utilizando NeuroKit2.
+
+    Los resultados se guardan en la caché compartida indexados por el hash de la señal, de modo
+    que todas las sesiones que abren el mismo registro reutilizan una única copia (de solo lectura).
+    Si el registro ya se analizó antes (en esta u otra ejecución), el resultado se recupera del
+    historial en lugar de reprocesarlo; en ese caso `signals` conserva la precisión float32 con
+    la que se guardó.
+    La señal se remuestrea primero a la frecuencia canónica (FS_CANONICA), de modo que
+    `signals` e `info` están siempre a esa frecuencia. Las anotaciones traducidas a los
+    índices de la señal original se añaden a `info` con el sufijo "_Original".
     
     Args:
         ecg_signal (np.array): La señal ECG.
         sampling_rate (int): La frecuencia de muestreo de la señal en Hz.
+        hash_registro (str, optional): Resultado de `clave_senal` si ya se ha calculado.
         
     Returns:
         tuple: Una tupla que contiene:
-            - signals (pd.DataFrame): DataFrame con la señal procesada y sus componentes.
+            - signals (pd.DataFrame): DataFrame con la señal procesada (a FS_CANONICA) y sus componentes.
             - info (dict): Diccionario con información sobre los picos y duraciones.
             - hrv (pd.DataFrame): DataFrame con las métricas de variabilidad de la frecuencia cardíaca.
     """
-    with st.spinner('Procesando señal ECG...'): # Muestra un spinner mientras se procesa
-        # Procesa la señal ECG para identificar picos R, segmentos, etc.
-        signals, info = nk.ecg_process(ecg_signal, sampling_rate=sampling_rate)
-        # Calcula las métricas de variabilidad de la frecuencia cardíaca (HRV)
-        hrv = nk.hrv(signals, sampling_rate=sampling_rate)
-    return signals, info, hrv
+    if hash_registro is None:
+        hash_registro = clave_senal(ecg_signal, sampling_rate)
+
+    def procesar():
+        # Registro ya analizado: se recupera del historial sin reprocesarlo
+        guardado = historial.buscar_resultado(hash_registro, "senal") if historial is not None else None
+        if guardado is not None and guardado["resultado"].get("archivo"):
+            try:
+                signals, info = importar_npz(guardado["resultado"]["archivo"])
+            except (OSError, ValueError) as e:
+                # El archivo de la señal se ha borrado o está dañado: se procesa de nuevo
+                logging.warning(f"No se pudo leer la señal guardada en el historial: {e}")
+            else:
+                hrv = pd.read_json(StringIO(guardado["resultado"]["hrv"]), orient="split")
+                return signals, info, hrv
+
+        with st.spinner('Procesando señal ECG...'): # Muestra un spinner mientras se procesa
+            # Lleva la señal a la frecuencia canónica (reduce el trabajo para señales de 1-2 kHz)
+            ecg_canonica = remuestrear(ecg_signal, sampling_rate, FS_CANONICA)
+            # Procesa la señal ECG para identificar picos R, segmentos, etc.
+            signals, info = nk.ecg_process(ecg_canonica, sampling_rate=FS_CANONICA)
+            # Calcula las métricas de variabilidad de la frecuencia cardíaca (HRV)
+            hrv = nk.hrv(signals, sampling_rate=FS_CANONICA)
+            # Anotaciones en índices de la señal original
+            info.update(anotaciones_a_origen(info, sampling_rate, len(ecg_signal), FS_CANONICA))
+            info["sampling_rate_original"] = sampling_rate
+
+        # Guarda la señal procesada (NPZ, en un archivo junto a la base de datos) y la HRV para
+        # no tener que reprocesar el registro; las señales mayores que el límite no se guardan
+        if historial is not None:
+            archivo = historial.guardar_datos(hash_registro, "senal", lambda destino: exportar_npz(signals, info, destino))
+            if archivo is not None:
+                historial.guardar_resultado(hash_registro, "senal", {"hrv": hrv.to_json(orient="split"), "archivo": archivo})
+        return signals, info, hrv
+
+    return cache.obtener_o_calcular(hash_registro, procesar, session_id)
 
 # Función para interpretar el ECG y generar un diagnóstico básico
 def interpret_ecg(metrics):
@@ -119,6 +195,17 @@ def interpret_ecg(metrics):
             diagnosis.append(("QT corto", "ℹ️")) # Información
     else:
         diagnosis.append(("Intervalo QT no disponible", "❓"))
+
+    # Cribado de irregularidad del ritmo (ventanas deslizantes de RR)
+    episodios = metrics.get("Episodios de ritmo irregular", np.nan)
+    if not np.isnan(episodios):
+        if episodios > 0:
+            carga = metrics.get("Carga de ritmo irregular (%)", np.nan)
+            diagnosis.append((f"Ritmo irregular: {int(episodios)} episodio(s), {carga:.1f}% del registro (posible fibrilación auricular)", "⚠️")) # Advertencia
+        else:
+            diagnosis.append(("Ritmo regular en el cribado de intervalos RR", "✅")) # Correcto
+    else:
+        diagnosis.append(("Cribado de arritmias no disponible (pocos latidos)", "❓"))
     
     return diagnosis
 
@@ -127,14 +214,19 @@ ecg_signal = None # Inicializa la señal ECG
 sampling_rate = None # Inicializa la frecuencia de muestreo
 
 if option == "Simular ECG":
-    # Simula la señal ECG usando NeuroKit2
-    ecg_signal = nk.ecg_simulate(
-        duration=duration, 
-        heart_rate=heart_rate, 
-        noise=noise,
-        sampling_rate=1000 # Frecuencia de muestreo fija para la simulación
+    # Simula la señal ECG usando NeuroKit2 (una vez por combinación de parámetros, compartida entre sesiones)
+    ecg_signal = cache.obtener_o_calcular(
+        hash_contenido("ecg_simulate", duration, heart_rate, noise, 1000),
+        lambda: nk.ecg_simulate(
+            duration=duration, 
+            heart_rate=heart_rate, 
+            noise=noise,
+            sampling_rate=1000 # Frecuencia de muestreo fija para la simulación
+        ),
+        session_id
     )
     sampling_rate = 1000
+    nombre_registro = f"Simulación ({duration} s, {heart_rate} lpm, ruido {noise:.2f})"
     st.success(f"✅ ECG simulado: {duration} segundos, {heart_rate} lpm, ruido: {noise:.2f}")
 else: # Si la opción es "Cargar archivo"
     # Manejo de la carga de archivos
@@ -146,20 +238,28 @@ else: # Si la opción es "Cargar archivo"
     
     if uploaded_file is not None:
         try:
-            # Lee el archivo dependiendo de su tipo
-            if uploaded_file.name.endswith('.csv'):
-                data = pd.read_csv(uploaded_file)
-            else: # Asume .xlsx
-                data = pd.read_excel(uploaded_file)
-            
-            # Asume que la primera columna contiene la señal ECG
-            ecg_signal = data.iloc[:, 0].values
+            def leer_senal():
+                # Lee el archivo dependiendo de su tipo
+                if uploaded_file.name.endswith('.csv'):
+                    data = pd.read_csv(uploaded_file)
+                else: # Asume .xlsx
+                    data = pd.read_excel(uploaded_file)
+                # Asume que la primera columna contiene la señal ECG
+                return data.iloc[:, 0].to_numpy(copy=True)
+
+            # El mismo archivo abierto desde varias sesiones se lee una vez y comparte un único buffer
+            ecg_signal = cache.obtener_o_calcular(
+                hash_contenido("archivo", uploaded_file.name, uploaded_file.getvalue()),
+                leer_senal,
+                session_id
+            )
             # Permite al usuario introducir la frecuencia de muestreo del archivo cargado
             sampling_rate = st.sidebar.number_input(
                 "Frecuencia de muestreo (Hz)", 
                 100, 2000, 1000, # Rango y valor predeterminado
                 help="Frecuencia a la que se adquirió la señal"
             )
+            nombre_registro = uploaded_file.name
             st.success("✅ Archivo cargado correctamente")
         except Exception as e:
             # Muestra un mensaje de error si la carga falla
@@ -173,7 +273,8 @@ else: # Si la opción es "Cargar archivo"
 # Procesa la señal ECG solo si ecg_signal y sampling_rate están definidos
 if ecg_signal is not None and sampling_rate is not None:
     try:
-        signals, info, hrv = process_ecg(ecg_signal, sampling_rate)
+        hash_registro = clave_senal(ecg_signal, sampling_rate)
+        signals, info, hrv = process_ecg(ecg_signal, sampling_rate, hash_registro)
     except Exception as e:
         st.error(f"❌ Error al procesar la señal ECG: {str(e)}")
         st.stop()
@@ -201,9 +302,24 @@ if ecg_signal is not None and sampling_rate is not None:
     metrics["Intervalo PR (ms)"] = info.get("duration_PR", np.nan)
     metrics["Intervalo QT (ms)"] = info.get("duration_QT", np.nan)
 
+    # Cribado de arritmias sobre los intervalos RR (None si hay muy pocos latidos)
+    cribado = cribar_arritmias(info.get("ECG_R_Peaks", []), FS_CANONICA)
+    if cribado is not None:
+        metrics["Episodios de ritmo irregular"] = len(cribado["episodios"])
+        metrics["Carga de ritmo irregular (%)"] = 100 * cribado["carga_irregular"]
+    else:
+        metrics["Episodios de ritmo irregular"] = np.nan
+        metrics["Carga de ritmo irregular (%)"] = np.nan
+
+    # Registra el análisis en el historial una sola vez por sesión, registro y paciente
+    # (el script se vuelve a ejecutar en cada interacción)
+    analisis_registrados = st.session_state.setdefault("analisis_registrados", set())
+    if historial is not None and (hash_registro, paciente_id) not in analisis_registrados:
+        historial.registrar_analisis(hash_registro, "senal", metrics, paciente_id, nombre_registro)
+        analisis_registrados.add((hash_registro, paciente_id))
 
     # Muestra los resultados en pestañas para una mejor organización
-    tab1, tab2, tab3 = st.tabs(["📈 Visualización", "📊 Métricas", "🩺 Diagnóstico"])
+    tab1, tab2, tab3, tab4 = st.tabs(["📈 Visualización", "📊 Métricas", "🩺 Diagnóstico", "🗂️ Historial"])
 
     with tab1:
         # Visualización de la señal ECG procesada
@@ -218,15 +334,16 @@ if ecg_signal is not None and sampling_rate is not None:
             # NeuroKit2 necesita suficientes picos R para segmentar. 
             # Un valor de 1000-2000 muestras suele ser un mínimo razonable para señales típicas.
             # Ajusta este umbral si tus señales son muy diferentes.
-            min_data_length_for_plot = 2 * sampling_rate # Por ejemplo, al menos 2 segundos de datos
+            min_data_length_for_plot = 2 * FS_CANONICA # Por ejemplo, al menos 2 segundos de datos (signals está a FS_CANONICA)
             
             if pd.api.types.is_numeric_dtype(ecg_clean_data) and np.isfinite(ecg_clean_data).all():
                 if len(ecg_clean_data) >= min_data_length_for_plot:
-                    # Usamos min(len(signals), 3000) para no intentar acceder a más datos de los que existen
-                    plot_data_length = min(len(signals), 3000) 
+                    # Primeros 3 segundos, sin intentar acceder a más datos de los que existen
+                    plot_data_length = min(len(signals), 3 * FS_CANONICA)
                     nk.ecg_plot(signals[:plot_data_length]) # NeuroKit2 creará su propia figura
                     plt.tight_layout() # Ajusta el layout para evitar solapamientos
                     st.pyplot(plt.gcf()) # Muestra la figura actual de Matplotlib
+                    plt.close('all') # Cierra la figura tras mostrarla para liberar memoria
                 else:
                     st.warning(f"La señal es demasiado corta ({len(ecg_clean_data)} muestras) para generar una visualización detallada. Se requieren al menos {min_data_length_for_plot} muestras.")
                     plt.close('all') # Cierra todas las figuras para liberar memoria
@@ -236,6 +353,45 @@ if ecg_signal is not None and sampling_rate is not None:
         else:
             st.warning("No se pudo generar la visualización de la señal procesada. La señal podría ser inválida o faltar la columna 'ECG_Clean'.")
             plt.close('all') # Cierra todas las figuras para liberar memoria
+
+        # Tendencia de HRV en ventana deslizante (MeanHR, SDNN, RMSSD, pNN50) junto a la señal
+        st.subheader("Tendencia de HRV")
+        # La tendencia necesita que la ventana quepa entre el primer y el último pico R
+        picos_r = np.asarray(info.get("ECG_R_Peaks", []), dtype=np.float64)
+        picos_r = picos_r[np.isfinite(picos_r)]
+        duracion_picos = (picos_r[-1] - picos_r[0]) / FS_CANONICA if len(picos_r) >= 3 else 0.0
+        col_ventana, col_paso = st.columns(2)
+        ventana_hrv = col_ventana.number_input(
+            "Ventana (s)", 2, 3600, int(min(VENTANA_S, max(2, duracion_picos // 2))),
+            help="Duración de cada ventana de HRV (5 min es el estándar para registros largos)"
+        )
+        paso_hrv = col_paso.number_input(
+            "Paso (s)", 1, 600, int(min(PASO_S, max(1, ventana_hrv // 4))),
+            help="Desplazamiento entre ventanas consecutivas"
+        )
+        tendencia = tendencia_hrv(picos_r, FS_CANONICA, ventana_hrv, paso_hrv)
+
+        if len(tendencia["Tiempo (s)"]) > 0 and 'ECG_Clean' in signals.columns:
+            fig_hrv, axes_hrv = plt.subplots(4, 1, figsize=(12, 9), sharex=True)
+            # Para registros largos se dibuja una muestra de cada `paso_dibujo` (máx. ~20000 puntos)
+            paso_dibujo = max(1, len(signals) // 20000)
+            t_senal = np.arange(0, len(signals), paso_dibujo) / FS_CANONICA
+            axes_hrv[0].plot(t_senal, signals['ECG_Clean'].values[::paso_dibujo], linewidth=0.5)
+            axes_hrv[0].set_ylabel("ECG")
+            axes_hrv[1].plot(tendencia["Tiempo (s)"], tendencia["HRV_MeanHR"], color="tab:red")
+            axes_hrv[1].set_ylabel("MeanHR (lpm)")
+            axes_hrv[2].plot(tendencia["Tiempo (s)"], tendencia["HRV_SDNN"], label="SDNN")
+            axes_hrv[2].plot(tendencia["Tiempo (s)"], tendencia["HRV_RMSSD"], label="RMSSD")
+            axes_hrv[2].set_ylabel("ms")
+            axes_hrv[2].legend(loc="upper right")
+            axes_hrv[3].plot(tendencia["Tiempo (s)"], tendencia["HRV_pNN50"], color="tab:green")
+            axes_hrv[3].set_ylabel("pNN50 (%)")
+            axes_hrv[3].set_xlabel("Tiempo (s)")
+            fig_hrv.tight_layout()
+            st.pyplot(fig_hrv)
+            plt.close(fig_hrv) # Libera la memoria de la figura
+        else:
+            st.info(f"Entre el primer y el último pico R hay {duracion_picos:.1f} s: no cabe una ventana de {ventana_hrv} s.")
         
         # Opción para mostrar la señal ECG cruda
         if st.checkbox("Mostrar señal ECG cruda"):
@@ -247,6 +403,7 @@ if ecg_signal is not None and sampling_rate is not None:
             ax_raw.set_xlabel("Muestras")
             ax_raw.set_ylabel("Amplitud")
             st.pyplot(fig_raw)
+            plt.close(fig_raw) # Libera la memoria de la figura
 
     with tab2:
         # Muestra las métricas clave en un DataFrame
@@ -272,6 +429,13 @@ if ecg_signal is not None and sampling_rate is not None:
         st.subheader("Interpretación ECG")
         for condition, icon in diagnosis:
             st.markdown(f"{icon} {condition}") # Muestra cada condición con su icono
+
+        # Episodios de ritmo irregular detectados por el cribado de RR
+        if cribado is not None and cribado["episodios"]:
+            st.subheader("Episodios de ritmo irregular")
+            st.dataframe(pd.DataFrame(cribado["episodios"]).rename(columns={
+                "inicio_s": "Inicio (s)", "fin_s": "Fin (s)", "latidos": "Latidos"
+            }))
         
         # Añade recomendaciones generales
         st.subheader("Recomendaciones")
@@ -281,6 +445,52 @@ if ecg_signal is not None and sampling_rate is not None:
         else:
             st.success("Los resultados parecen normales. Para una una evaluación completa, consulte con su médico.")
 
+    with tab4:
+        # Historial de análisis del paciente indicado, del más reciente al más antiguo
+        st.subheader(f"Historial de análisis{f' del paciente {paciente_id}' if paciente_id else ''}")
+        # Pila de cursores de las páginas visitadas; se reinicia al cambiar de paciente
+        if st.session_state.get("historial_paciente", "") != paciente_id:
+            st.session_state["historial_paciente"] = paciente_id
+            st.session_state["historial_cursores"] = [None]
+        cursores = st.session_state["historial_cursores"]
+        pagina = None
+        if historial is None:
+            st.info("El historial no está disponible: no se pudo abrir la base de datos (variable ECG_HISTORIAL_DB).")
+        elif not paciente_id:
+            # Sin paciente no se lista nada: el historial no muestra análisis de todos los pacientes
+            st.info("Introduce un ID de paciente en la barra lateral para ver su historial.")
+        else:
+            try:
+                pagina = historial.historial(paciente_id, LIMITE_PAGINA, cursores[-1])
+            except sqlite3.Error as e:
+                st.warning(f"No se pudo leer el historial: {str(e)}")
+
+        if pagina is not None and pagina["analisis"]:
+            filas_historial = []
+            for analisis in pagina["analisis"]:
+                resumen = analisis["resumen"] or {}
+                filas_historial.append({
+                    "Fecha": datetime.fromtimestamp(analisis["creado"]).strftime("%Y-%m-%d %H:%M:%S"),
+                    "Registro": analisis["nombre"],
+                    "Actual": "▶" if analisis["hash_registro"] == hash_registro else "",
+                    "Frecuencia cardíaca": resumen.get("Frecuencia cardíaca"),
+                    "SDNN (ms)": resumen.get("SDNN (ms)"),
+                    "RMSSD (ms)": resumen.get("RMSSD (ms)"),
+                    "Carga de ritmo irregular (%)": resumen.get("Carga de ritmo irregular (%)"),
+                    "Diagnóstico": resumen.get("diagnosis"), # Análisis de imágenes del backend
+                })
+            st.dataframe(pd.DataFrame(filas_historial), hide_index=True)
+        elif pagina is not None:
+            st.info("No hay análisis guardados para este paciente.")
+
+        col_recientes, col_antiguos = st.columns(2)
+        if col_recientes.button("← Más recientes", disabled=len(cursores) == 1):
+            cursores.pop()
+            st.rerun()
+        if col_antiguos.button("Más antiguos →", disabled=pagina is None or pagina["siguiente"] is None):
+            cursores.append(pagina["siguiente"])
+            st.rerun()
+
     # Opciones de descarga en la barra lateral
     st.sidebar.header("📤 Exportar resultados")
     if st.sidebar.button("Guardar métricas como CSV"):
@@ -293,6 +503,51 @@ if ecg_signal is not None and sampling_rate is not None:
             mime='text/csv'
         )
 
+    # Exportación de la señal procesada completa (ECG_Clean, ECG_Rate, marcas de picos) y anotaciones
+    formato_exportacion = st.sidebar.selectbox(
+        "Formato de la señal procesada",
+        list(FORMATOS_EXPORTACION.keys()),
+        help="Parquet/Arrow requieren pyarrow. Valores en float32 y marcas de picos empaquetadas en bits."
+    )
+    if st.sidebar.button("Exportar señal procesada"):
+        formato = FORMATOS_EXPORTACION[formato_exportacion]
+        try:
+            # La exportación se escribe por bloques en un archivo temporal, sin copias intermedias en
+            # memoria; download_button lee después el archivo completo y lo guarda en el almacén de
+            # medios de Streamlit, así que el resultado final sí ocupa memoria mientras dure la sesión.
+            # El archivo temporal se cierra (y se borra) en cuanto download_button lo ha leído.
+            # (sin buffer: download_button acepta objetos io.RawIOBase)
+            with tempfile.TemporaryFile(buffering=0) as archivo_exportado:
+                exportar_senales(signals, info, formato_exportacion, archivo_exportado)
+                archivo_exportado.seek(0)
+                st.sidebar.download_button(
+                    label=f"Descargar {formato_exportacion}",
+                    data=archivo_exportado,
+                    file_name=f"ecg_senal_procesada.{formato['extension']}",
+                    mime=formato['mime']
+                )
+        except ImportError:
+            st.sidebar.error("❌ Este formato requiere 'pyarrow'. Instálalo o elige NPZ.")
+        except Exception as e:
+            st.sidebar.error(f"❌ Error al exportar la señal: {str(e)}")
+
+# Uso de memoria de la caché compartida (global y por sesión)
+with st.sidebar.expander("🧠 Memoria compartida"):
+    estadisticas_cache = cache.estadisticas()
+    st.metric("Uso de la caché", f"{estadisticas_cache['bytes'] / 2**20:.1f} MB",
+              help=f"Límite: {estadisticas_cache['max_bytes'] / 2**20:.0f} MB (variable de entorno ECG_CACHE_MAX_MB)")
+    st.caption(f"{estadisticas_cache['entradas']} entradas · aciertos: {100 * estadisticas_cache['tasa_aciertos']:.0f}% · "
+               f"desalojos: {estadisticas_cache['desalojos']}")
+    uso_sesiones = cache.uso_sesiones()
+    if uso_sesiones:
+        # Una entrada compartida cuenta en cada sesión que la usa
+        st.dataframe(pd.DataFrame([
+            {"Sesión": ("▶ " if sesion == session_id else "") + sesion[:8],
+             "Entradas": datos["entradas"],
+             "MB referenciados": round(datos["bytes"] / 2**20, 2)}
+            for sesion, datos in uso_sesiones.items()
+        ]), hide_index=True)
+
 # Pie de página de la aplicación
 st.markdown("---")
 st.caption("Aplicación desarrollada para análisis ECG básico. No sustituye evaluación médica profesional.")
@@ -0,0 +1,204 @@
+"""
+Variante ASGI (asíncrona) del backend de app_backend.py para producción.
+
+Expone las mismas rutas y el mismo contrato JSON que el backend Flask, de modo que
+App.js / index.html funcionan sin cambios:
+- Las subidas multipart se procesan en streaming (los archivos se vuelcan a disco por
+  encima de 1 MB) y con límite de tamaño por solicitud.
+- Las llamadas bloqueantes a los SDKs (Vertex AI, OpenAI) se ejecutan en un pool de hilos
+  para no bloquear el bucle de eventos.
+
+Uso:
+    python app_asgi.py
+    # o con gunicorn:
+    GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker gunicorn -c gunicorn.conf.py app_asgi:app
+
+Configuración (variables de entorno):
+    PORT                  Puerto de escucha (5000)
+    WEB_CONCURRENCY       Número de procesos worker (2)
+    ASGI_THREADS          Hilos para las llamadas bloqueantes a los SDKs, por worker (40)
+    KEEPALIVE_S           Segundos que se mantiene abierta una conexión keep-alive inactiva (75)
+    MAX_SOLICITUD_MB      Tamaño máximo del cuerpo de una solicitud (50)
+    MAX_ARCHIVOS          Número máximo de imágenes por solicitud a /analyze-ecg (20)
+    LIMITE_CONCURRENCIA   Conexiones simultáneas por worker antes de responder 503 (sin límite)
+
+Requiere starlette, uvicorn y python-multipart.
+"""
+import asyncio
+import contextlib
+import json
+import os
+
+import anyio.to_thread
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import UploadFile
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+from app_backend import (
+    analizar_imagen_ecg,
+    calentar_dependencias,
+    consultar_historial,
+    informe_importaciones,
+    obtener_endpoint_vertex,
+    responder_chatbot,
+)
+from historial import LIMITE_PAGINA
+
+PUERTO = int(os.environ.get('PORT', '5000'))
+WORKERS = int(os.environ.get('WEB_CONCURRENCY', '2'))
+HILOS = int(os.environ.get('ASGI_THREADS', '40'))
+KEEPALIVE_S = int(os.environ.get('KEEPALIVE_S', '75'))
+MAX_SOLICITUD_BYTES = int(float(os.environ.get('MAX_SOLICITUD_MB', '50')) * 1024 * 1024)
+MAX_ARCHIVOS = int(os.environ.get('MAX_ARCHIVOS', '20'))
+LIMITE_CONCURRENCIA = int(os.environ['LIMITE_CONCURRENCIA']) if os.environ.get('LIMITE_CONCURRENCIA') else None
+
+
+class SolicitudDemasiadoGrande(Exception):
+    """El cuerpo de la solicitud supera MAX_SOLICITUD_BYTES."""
+
+
+class LimiteTamanoSolicitud:
+    """
+    Middleware ASGI que rechaza con 413 las solicitudes cuyo cuerpo supera `max_bytes`.
+
+    Comprueba la cabecera Content-Length y, para cuerpos sin ella (chunked), cuenta los
+    bytes a medida que se reciben, sin esperar a tener el cuerpo completo.
+    """
+
+    def __init__(self, app, max_bytes):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        longitud = dict(scope["headers"]).get(b"content-length")
+        if longitud is not None and longitud.isdigit() and int(longitud) > self.max_bytes:
+            await self._responder_413(scope, receive, send)
+            return
+
+        recibidos = 0
+        respuesta_iniciada = False
+
+        async def receive_limitado():
+            nonlocal recibidos
+            mensaje = await receive()
+            if mensaje["type"] == "http.request":
+                recibidos += len(mensaje.get("body", b""))
+                if recibidos > self.max_bytes:
+                    raise SolicitudDemasiadoGrande()
+            return mensaje
+
+        async def send_vigilado(mensaje):
+            nonlocal respuesta_iniciada
+            if mensaje["type"] == "http.response.start":
+                respuesta_iniciada = True
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive_limitado, send_vigilado)
+        except SolicitudDemasiadoGrande:
+            if not respuesta_iniciada:
+                await self._responder_413(scope, receive, send)
+
+    async def _responder_413(self, scope, receive, send):
+        limite_mb = self.max_bytes / (1024 * 1024)
+        respuesta = JSONResponse({'error': f'La solicitud supera el tamaño máximo permitido ({limite_mb:.0f} MB)'},
+                                 status_code=413)
+        await respuesta(scope, receive, send)
+
+
+async def home(request):
+    return PlainTextResponse("Backend de ECG Cloud funcionando. Accede a la interfaz de usuario a través de tu archivo index.html.")
+
+
+async def analyze_ecg(request):
+    async with request.form(max_files=MAX_ARCHIVOS) as form:
+        if 'ecg_image' not in form:
+            return JSONResponse({'error': 'No se encontró la imagen de ECG en la solicitud'}, status_code=400)
+
+        ecg_files = [archivo for archivo in form.getlist('ecg_image') if isinstance(archivo, UploadFile)]
+        if not ecg_files:
+            return JSONResponse({'error': 'No se encontraron archivos válidos para procesar'}, status_code=400)
+
+        vertex_ai_endpoint = await run_in_threadpool(obtener_endpoint_vertex)
+        paciente_id = form.get('patient_id')
+        paciente_id = paciente_id if isinstance(paciente_id, str) else None
+
+        async def procesar(ecg_file):
+            file_bytes = await ecg_file.read()
+            return await run_in_threadpool(analizar_imagen_ecg, ecg_file.filename, file_bytes,
+                                           vertex_ai_endpoint, paciente_id)
+
+        # Las imágenes de una misma solicitud se analizan en paralelo; gather conserva el orden
+        results = await asyncio.gather(*(procesar(ecg_file) for ecg_file in ecg_files))
+
+    return JSONResponse(list(results), status_code=200)
+
+
+async def ask_chatbot(request):
+    try:
+        datos = await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return JSONResponse({"error": "El cuerpo de la solicitud no es JSON válido"}, status_code=400)
+    user_message = datos.get('message') if isinstance(datos, dict) else None
+    payload, status = await run_in_threadpool(responder_chatbot, user_message)
+    return JSONResponse(payload, status_code=status)
+
+
+async def history(request):
+    parametros = request.query_params
+    payload, status = await run_in_threadpool(consultar_historial, parametros.get('patient_id'),
+                                              parametros.get('limit', LIMITE_PAGINA), parametros.get('cursor'))
+    return JSONResponse(payload, status_code=status)
+
+
+async def startup_report(request):
+    informe = informe_importaciones()
+    return JSONResponse({"modulos_ms": informe, "total_ms": round(sum(informe.values()), 1)})
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # Tamaño del pool de hilos usado por run_in_threadpool para las llamadas bloqueantes
+    anyio.to_thread.current_default_thread_limiter().total_tokens = HILOS
+    calentar_dependencias()
+    yield
+
+
+app = Starlette(
+    routes=[
+        Route('/', home),
+        Route('/analyze-ecg', analyze_ecg, methods=['POST']),
+        Route('/ask-chatbot', ask_chatbot, methods=['POST']),
+        Route('/history', history, methods=['GET']),
+        Route('/startup-report', startup_report, methods=['GET']),
+    ],
+    middleware=[
+        # Igual que CORS(app) en el backend Flask
+        Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*']),
+        Middleware(LimiteTamanoSolicitud, max_bytes=MAX_SOLICITUD_BYTES),
+    ],
+    lifespan=lifespan,
+)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run(
+        "app_asgi:app",
+        host='0.0.0.0',
+        port=PUERTO,
+        workers=WORKERS,
+        timeout_keep_alive=KEEPALIVE_S,
+        limit_concurrency=LIMITE_CONCURRENCIA,
+        proxy_headers=True,
+        forwarded_allow_ips='*',
+    )
@@ -3,11 +3,20 @@ from dotenv import load_dotenv
 load_dotenv()
 from flask import Flask, request, jsonify, render_template_string
 from flask_cors import CORS
-from google.cloud import aiplatform # Para la integración con Vertex AI
 import base64
+import hashlib
 import json
 import logging
-import openai # Para el chatbot
+import sqlite3
+import threading
+import types
+import urllib.request
+from lazy_imports import importacion_diferida, informe_importaciones, precargar_en_segundo_plano
+from historial import LIMITE_PAGINA, obtener_historial
+
+# SDKs pesados: se importan en el primer uso (o en la precarga) y no al arrancar el worker
+aiplatform = importacion_diferida("google.cloud.aiplatform") # Para la integración con Vertex AI
+openai = importacion_diferida("openai") # Para el chatbot
 
 # Configurar logging para ver mensajes en la consola del backend
 logging.basicConfig(level=logging.INFO)
@@ -26,26 +35,298 @@ LOCATION = os.environ.get('GOOGLE_CLOUD_LOCATION', 'us-central1')
 # Puedes encontrar esto en la Consola de Google Cloud en Vertex AI -> Endpoints
 ENDPOINT_ID = os.environ.get('VERTEX_AI_ENDPOINT_ID', 'YOUR_VERTEX_AI_ENDPOINT_ID')
 
-# Inicializar cliente de Vertex AI
-vertex_ai_endpoint = None
-try:
-    if PROJECT_ID != 'your-google-cloud-project-id' and ENDPOINT_ID != 'YOUR_VERTEX_AI_ENDPOINT_ID':
-        aiplatform.init(project=PROJECT_ID, location=LOCATION)
-        endpoint_name = f"projects/{PROJECT_ID}/locations/{LOCATION}/endpoints/{ENDPOINT_ID}"
-        vertex_ai_endpoint = aiplatform.Endpoint(endpoint_name=endpoint_name)
-        logging.info(f"Cliente de Vertex AI inicializado y conectado al endpoint: {endpoint_name}")
-    else:
-        logging.warning("Variables de entorno GOOGLE_CLOUD_PROJECT_ID o VERTEX_AI_ENDPOINT_ID no configuradas. La integración con Vertex AI estará simulada.")
-except Exception as e:
-    logging.error(f"Error al inicializar el cliente de Vertex AI o conectar al endpoint: {e}")
-    vertex_ai_endpoint = None
+# Opcional: URL HTTP de predicción alternativa (ej. el servicio simulado de servicios_simulados.py
+# para pruebas de carga). Si se define, sustituye al SDK de Vertex AI.
+VERTEX_AI_PREDICT_URL = os.environ.get('VERTEX_AI_PREDICT_URL')
+
+VERTEX_AI_CONFIGURADO = PROJECT_ID != 'your-google-cloud-project-id' and ENDPOINT_ID != 'YOUR_VERTEX_AI_ENDPOINT_ID'
+if not VERTEX_AI_CONFIGURADO and not VERTEX_AI_PREDICT_URL:
+    logging.warning("Variables de entorno GOOGLE_CLOUD_PROJECT_ID o VERTEX_AI_ENDPOINT_ID no configuradas. La integración con Vertex AI estará simulada.")
+
+# El cliente de Vertex AI se inicializa en el primer uso (o en la precarga), no al importar el módulo
+_vertex_ai_endpoint = None
+_vertex_ai_inicializado = False
+_vertex_ai_lock = threading.Lock()
+
+class EndpointHTTP:
+    """
+    Endpoint de predicción accesible por HTTP con la misma interfaz que `aiplatform.Endpoint.predict`.
+
+    Envía `{"instances": [...]}` por POST y espera `{"predictions": [...]}`.
+    """
+
+    def __init__(self, url, timeout=60):
+        self.url = url
+        self.timeout = timeout
+
+    def predict(self, instances):
+        cuerpo = json.dumps({"instances": instances}).encode("utf-8")
+        solicitud = urllib.request.Request(self.url, data=cuerpo, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(solicitud, timeout=self.timeout) as respuesta:
+            datos = json.loads(respuesta.read())
+        return types.SimpleNamespace(predictions=datos.get("predictions", []))
+
+def obtener_endpoint_vertex():
+    """
+    Devuelve el endpoint de Vertex AI, inicializándolo la primera vez.
+
+    Returns:
+        aiplatform.Endpoint | None: El endpoint, o None si Vertex AI no está configurado
+            o falló la inicialización (en cuyo caso se usa la simulación).
+    """
+    global _vertex_ai_endpoint, _vertex_ai_inicializado
+    if _vertex_ai_inicializado:
+        return _vertex_ai_endpoint
+    with _vertex_ai_lock:
+        if not _vertex_ai_inicializado:
+            if VERTEX_AI_PREDICT_URL:
+                _vertex_ai_endpoint = EndpointHTTP(VERTEX_AI_PREDICT_URL)
+                logging.info(f"Usando endpoint de predicción HTTP: {VERTEX_AI_PREDICT_URL}")
+            elif VERTEX_AI_CONFIGURADO:
+                try:
+                    aiplatform.init(project=PROJECT_ID, location=LOCATION)
+                    endpoint_name = f"projects/{PROJECT_ID}/locations/{LOCATION}/endpoints/{ENDPOINT_ID}"
+                    _vertex_ai_endpoint = aiplatform.Endpoint(endpoint_name=endpoint_name)
+                    logging.info(f"Cliente de Vertex AI inicializado y conectado al endpoint: {endpoint_name}")
+                except Exception as e:
+                    logging.error(f"Error al inicializar el cliente de Vertex AI o conectar al endpoint: {e}")
+                    _vertex_ai_endpoint = None
+            _vertex_ai_inicializado = True
+    return _vertex_ai_endpoint
 
 # --- Configuración para OpenAI (Chatbot) ---
 # IMPORTANTE: Obtén tu clave de API de OpenAI y configúrala como variable de entorno
 # No la pongas directamente en el código en producción
-openai.api_key = os.environ.get('OPENAI_API_KEY', 'tu-api-key-de-openai')
-if openai.api_key == 'tu-api-key-de-openai':
+OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY', 'tu-api-key-de-openai')
+if OPENAI_API_KEY == 'tu-api-key-de-openai':
     logging.warning("OPENAI_API_KEY no configurada como variable de entorno. El chatbot de OpenAI usará una clave de placeholder (no funcionará sin una clave real).")
+# Opcional: URL base alternativa de la API de OpenAI (ej. el servicio simulado para pruebas de carga)
+OPENAI_API_BASE = os.environ.get('OPENAI_API_BASE')
+
+# Módulos que se precargan en segundo plano tras abrir el puerto
+MODULOS_PRECARGA = ["openai"] + (["google.cloud.aiplatform"] if VERTEX_AI_CONFIGURADO and not VERTEX_AI_PREDICT_URL else [])
+
+def calentar_dependencias():
+    """
+    Precarga los SDKs e inicializa Vertex AI en un hilo en segundo plano.
+
+    Se llama cuando el servidor ya está escuchando (hook `post_worker_init` de
+    gunicorn.conf.py o antes de `app.run`), para que la primera petición no
+    pague el coste de importación.
+    """
+    return precargar_en_segundo_plano(MODULOS_PRECARGA, al_terminar=obtener_endpoint_vertex)
+
+
+# --- Lógica compartida entre el backend Flask y la variante ASGI ---
+
+def analizar_imagen_ecg(file_name, file_bytes, vertex_ai_endpoint, paciente_id=None):
+    """
+    Analiza una imagen de ECG, o recupera el resultado del historial si ya se analizó.
+
+    Lo comparten el backend Flask y la variante ASGI (app_asgi.py). Los análisis correctos
+    se registran en el historial (historial.py) con el hash SHA-256 de la imagen. Los
+    resultados del endpoint de Vertex AI configurado se reutilizan: una imagen idéntica no
+    se vuelve a enviar al mismo endpoint. Si el historial no está disponible, la imagen
+    se analiza igualmente.
+
+    Args:
+        file_name (str): Nombre del archivo subido.
+        file_bytes (bytes): Contenido de la imagen.
+        vertex_ai_endpoint: Endpoint devuelto por `obtener_endpoint_vertex()`, o None para simular.
+        paciente_id (str, optional): Identificador del paciente con el que se registra el análisis.
+
+    Returns:
+        dict: Resultado del archivo con el formato de la respuesta de /analyze-ecg
+            (con 'from_history': True si procede del historial).
+    """
+    historial = obtener_historial()
+    if historial is None:
+        return _analizar_imagen(file_name, file_bytes, vertex_ai_endpoint)
+
+    hash_imagen = hashlib.sha256(file_bytes).hexdigest()
+    origen, reutilizable = _origen_imagen(vertex_ai_endpoint)
+
+    guardado = historial.buscar_resultado(hash_imagen, origen) if reutilizable else None
+    if guardado is not None:
+        logging.info(f"{file_name} ya analizado: se devuelve el resultado del historial.")
+        resultado = dict(guardado["resultado"], file_name=file_name, from_history=True,
+                         message='Imagen ya analizada: resultado recuperado del historial.')
+    else:
+        resultado = _analizar_imagen(file_name, file_bytes, vertex_ai_endpoint)
+        if resultado['status'] != 'success':
+            return resultado
+        if reutilizable:
+            historial.guardar_resultado(hash_imagen, origen, resultado)
+    historial.registrar_analisis(hash_imagen, origen, resultado, paciente_id, file_name)
+    return resultado
+
+def _origen_imagen(vertex_ai_endpoint):
+    """
+    Identifica quién produce el análisis de una imagen (junto con el hash, la clave del historial).
+
+    Returns:
+        tuple: (origen, reutilizable). Solo se reutilizan los resultados del endpoint de
+            Vertex AI, identificado por su ruta completa: la simulación (que depende del
+            nombre del archivo) y el endpoint HTTP alternativo (p. ej. el servicio simulado
+            de las pruebas de carga) se registran pero se vuelven a analizar.
+    """
+    if vertex_ai_endpoint is None:
+        return "imagen_simulada", False
+    if isinstance(vertex_ai_endpoint, EndpointHTTP):
+        return f"imagen_http:{vertex_ai_endpoint.url}", False
+    return f"imagen_vertex:projects/{PROJECT_ID}/locations/{LOCATION}/endpoints/{ENDPOINT_ID}", True
+
+def _analizar_imagen(file_name, file_bytes, vertex_ai_endpoint):
+    """Analiza la imagen con Vertex AI (o la simulación si no está configurado)."""
+    try:
+        if vertex_ai_endpoint:
+            # --- Preparar la imagen para la Predicción de Vertex AI ---
+            # La mayoría de los modelos de imagen de Vertex AI esperan bytes codificados en base64
+            encoded_image_string = base64.b64encode(file_bytes).decode("utf-8")
+
+            # La estructura de 'instances' depende de la firma de entrada de tu modelo.
+            # Para clasificación/detección de imágenes, comúnmente es una clave 'bytes_base64'.
+            instances = [
+                {"bytes_base64": encoded_image_string}
+            ]
+
+            logging.info(f"Enviando solicitud de predicción para {file_name} a Vertex AI...")
+            prediction_response = vertex_ai_endpoint.predict(instances=instances)
+            logging.info(f"Respuesta de predicción recibida para {file_name}.")
+
+            # --- Procesar la respuesta de predicción ---
+            # La estructura de prediction_response.predictions depende COMPLETAMENTE de la salida de tu modelo.
+            # Este es un ejemplo para un modelo de clasificación de imágenes típico (como AutoML Vision)
+            
+            if prediction_response.predictions:
+                prediction_data = prediction_response.predictions[0] # Asumiendo una sola imagen por solicitud
+
+                diagnosis = "No se pudo determinar el diagnóstico."
+                metrics = {}
+
+                if "display_names" in prediction_data and "confidences" in prediction_data:
+                    display_names = prediction_data["display_names"]
+                    confidences = prediction_data["confidences"]
+                    
+                    # Encontrar la clase con la mayor confianza
+                    max_confidence_index = confidences.index(max(confidences))
+                    diagnosis = display_names[max_confidence_index]
+                    
+                    metrics = {
+                        "predicted_class": diagnosis,
+                        "confidence": f"{confidences[max_confidence_index]:.4f}",
+                        "all_confidences": dict(zip(display_names, [f"{c:.4f}" for c in confidences]))
+                    }
+                elif isinstance(prediction_data, dict):
+                    # Si la salida de tu modelo es un diccionario personalizado (ej. de un modelo Keras personalizado)
+                    # Deberás parsearlo según la capa de salida de tu modelo
+                    diagnosis = prediction_data.get("label", "Diagnóstico personalizado no encontrado")
+                    metrics = prediction_data.get("details", {})
+                else:
+                    # Fallback para formato de salida inesperado
+                    diagnosis = "Formato de predicción desconocido."
+                    metrics = {"raw_prediction": prediction_data}
+
+                return {
+                    'file_name': file_name,
+                    'status': 'success',
+                    'diagnosis': diagnosis,
+                    'metrics': metrics,
+                    'message': 'Análisis completado con éxito por Vertex AI.'
+                }
+            else:
+                return {
+                    'file_name': file_name,
+                    'status': 'warning',
+                    'message': 'Vertex AI no retornó predicciones para esta imagen.'
+                }
+        else:
+            # --- Simulación si Vertex AI no está configurado ---
+            simulated_diagnosis = "Ritmo Sinusal Normal (Simulado)"
+            simulated_metrics = {
+                "heart_rate": 75,
+                "pr_interval": "160ms",
+                "qrs_duration": "90ms",
+                "qt_interval": "380ms",
+                "rhythm_variability": "Normal"
+            }
+            if "abnormal" in file_name.lower() or "arritmia" in file_name.lower():
+                simulated_diagnosis = "Posible Arritmia Detectada (Simulado)"
+                simulated_metrics["heart_rate"] = 130
+                simulated_metrics["rhythm_variability"] = "Irregular"
+
+            return {
+                'file_name': file_name,
+                'status': 'success',
+                'diagnosis': simulated_diagnosis,
+                'metrics': simulated_metrics,
+                'message': 'Análisis simulado. Configura Vertex AI para resultados reales.'
+            }
+
+    except Exception as e:
+        logging.error(f"Error al procesar el archivo {file_name} con Vertex AI/Simulación: {e}")
+        return {
+            'file_name': file_name,
+            'status': 'error',
+            'error': str(e),
+            'message': 'Error al comunicarse con Vertex AI o al procesar la imagen.'
+        }
+
+def responder_chatbot(user_message):
+    """
+    Obtiene la respuesta del chatbot de OpenAI para `user_message`.
+
+    Lo comparten el backend Flask y la variante ASGI (app_asgi.py).
+
+    Returns:
+        tuple: (cuerpo JSON de la respuesta, código de estado HTTP)
+    """
+    if not user_message:
+        return {"error": "Mensaje de usuario no proporcionado"}, 400
+
+    if not OPENAI_API_KEY or OPENAI_API_KEY == 'tu-api-key-de-openai':
+        return {"error": "La clave de API de OpenAI no está configurada en el backend."}, 500
+
+    try:
+        logging.info(f"Recibiendo mensaje para chatbot: {user_message}")
+        openai.api_key = OPENAI_API_KEY
+        if OPENAI_API_BASE:
+            openai.api_base = OPENAI_API_BASE
+        response = openai.ChatCompletion.create(
+            model="gpt-3.5-turbo", # Puedes usar "gpt-4" o "gpt-4o" si tienes acceso
+            messages=[{"role": "user", "content": user_message}]
+        )
+        chatbot_response = response.choices[0].message['content']
+        logging.info(f"Respuesta del chatbot: {chatbot_response}")
+        return {"response": chatbot_response}, 200
+    except Exception as e:
+        logging.error(f"Error al comunicarse con la API de OpenAI: {e}")
+        return {"error": f"Error al obtener respuesta del chatbot: {str(e)}"}, 500
+
+
+def consultar_historial(paciente_id=None, limite=LIMITE_PAGINA, cursor=None):
+    """
+    Devuelve una página del historial de análisis de un paciente (del más reciente al más antiguo).
+
+    Lo comparten el backend Flask y la variante ASGI (app_asgi.py). El paciente es obligatorio:
+    no se expone un listado de los análisis de todos los pacientes.
+
+    Returns:
+        tuple: (cuerpo JSON de la respuesta, código de estado HTTP)
+    """
+    if not paciente_id:
+        return {"error": "Falta el parámetro 'patient_id'"}, 400
+    historial = obtener_historial()
+    if historial is None:
+        return {"error": "El historial de análisis no está disponible en este servidor."}, 503
+    try:
+        limite = int(limite)
+        return historial.historial(paciente_id, limite, cursor or None), 200
+    except sqlite3.Error as e:
+        logging.error(f"Error al consultar el historial de análisis: {e}")
+        return {"error": "No se pudo leer el historial de análisis."}, 503
+    except ValueError:
+        return {"error": "Parámetros de paginación no válidos ('limit' debe ser un entero y 'cursor' el valor 'siguiente' de la página anterior)"}, 400
 
 
 # --- Rutas de la Aplicación Flask ---
@@ -67,141 +348,38 @@ def analyze_ecg():
     if not ecg_files:
         return jsonify({'error': 'No se encontraron archivos válidos para procesar'}), 400
 
+    vertex_ai_endpoint = obtener_endpoint_vertex()
+    paciente_id = request.form.get('patient_id')
     results = []
     for ecg_file in ecg_files:
-        file_name = ecg_file.filename
-        file_bytes = ecg_file.read()
-
-        try:
-            if vertex_ai_endpoint:
-                # --- Preparar la imagen para la Predicción de Vertex AI ---
-                # La mayoría de los modelos de imagen de Vertex AI esperan bytes codificados en base64
-                encoded_image_string = base64.b64encode(file_bytes).decode("utf-8")
-
-                # La estructura de 'instances' depende de la firma de entrada de tu modelo.
-                # Para clasificación/detección de imágenes, comúnmente es una clave 'bytes_base64'.
-                instances = [
-                    {"bytes_base64": encoded_image_string}
-                ]
-
-                logging.info(f"Enviando solicitud de predicción para {file_name} a Vertex AI...")
-                prediction_response = vertex_ai_endpoint.predict(instances=instances)
-                logging.info(f"Respuesta de predicción recibida para {file_name}.")
-
-                # --- Procesar la respuesta de predicción ---
-                # La estructura de prediction_response.predictions depende COMPLETAMENTE de la salida de tu modelo.
-                # Este es un ejemplo para un modelo de clasificación de imágenes típico (como AutoML Vision)
-                
-                if prediction_response.predictions:
-                    prediction_data = prediction_response.predictions[0] # Asumiendo una sola imagen por solicitud
-
-                    diagnosis = "No se pudo determinar el diagnóstico."
-                    metrics = {}
-
-                    if "display_names" in prediction_data and "confidences" in prediction_data:
-                        display_names = prediction_data["display_names"]
-                        confidences = prediction_data["confidences"]
-                        
-                        # Encontrar la clase con la mayor confianza
-                        max_confidence_index = confidences.index(max(confidences))
-                        diagnosis = display_names[max_confidence_index]
-                        
-                        metrics = {
-                            "predicted_class": diagnosis,
-                            "confidence": f"{confidences[max_confidence_index]:.4f}",
-                            "all_confidences": dict(zip(display_names, [f"{c:.4f}" for c in confidences]))
-                        }
-                    elif isinstance(prediction_data, dict):
-                        # Si la salida de tu modelo es un diccionario personalizado (ej. de un modelo Keras personalizado)
-                        # Deberás parsearlo según la capa de salida de tu modelo
-                        diagnosis = prediction_data.get("label", "Diagnóstico personalizado no encontrado")
-                        metrics = prediction_data.get("details", {})
-                    else:
-                        # Fallback para formato de salida inesperado
-                        diagnosis = "Formato de predicción desconocido."
-                        metrics = {"raw_prediction": prediction_data}
-
-                    results.append({
-                        'file_name': file_name,
-                        'status': 'success',
-                        'diagnosis': diagnosis,
-                        'metrics': metrics,
-                        'message': 'Análisis completado con éxito por Vertex AI.'
-                    })
-                else:
-                    results.append({
-                        'file_name': file_name,
-                        'status': 'warning',
-                        'message': 'Vertex AI no retornó predicciones para esta imagen.'
-                    })
-            else:
-                # --- Simulación si Vertex AI no está configurado ---
-                simulated_diagnosis = "Ritmo Sinusal Normal (Simulado)"
-                simulated_metrics = {
-                    "heart_rate": 75,
-                    "pr_interval": "160ms",
-                    "qrs_duration": "90ms",
-                    "qt_interval": "380ms",
-                    "rhythm_variability": "Normal"
-                }
-                if "abnormal" in file_name.lower() or "arritmia" in file_name.lower():
-                    simulated_diagnosis = "Posible Arritmia Detectada (Simulado)"
-                    simulated_metrics["heart_rate"] = 130
-                    simulated_metrics["rhythm_variability"] = "Irregular"
-
-                results.append({
-                    'file_name': file_name,
-                    'status': 'success',
-                    'diagnosis': simulated_diagnosis,
-                    'metrics': simulated_metrics,
-                    'message': 'Análisis simulado. Configura Vertex AI para resultados reales.'
-                })
-
-        except Exception as e:
-            logging.error(f"Error al procesar el archivo {file_name} con Vertex AI/Simulación: {e}")
-            results.append({
-                'file_name': file_name,
-                'status': 'error',
-                'error': str(e),
-                'message': 'Error al comunicarse con Vertex AI o al procesar la imagen.'
-            })
+        results.append(analizar_imagen_ecg(ecg_file.filename, ecg_file.read(), vertex_ai_endpoint, paciente_id))
 
     return jsonify(results), 200
 
 # Ruta para el Chatbot con IA (OpenAI)
 @app.route('/ask-chatbot', methods=['POST'])
 def ask_chatbot():
-    user_message = request.json.get('message')
-    if not user_message:
-        return jsonify({"error": "Mensaje de usuario no proporcionado"}), 400
-
-    if not openai.api_key or openai.api_key == 'tu-api-key-de-openai':
-        return jsonify({"error": "La clave de API de OpenAI no está configurada en el backend."}), 500
-
-    try:
-        logging.info(f"Recibiendo mensaje para chatbot: {user_message}")
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo", # Puedes usar "gpt-4" o "gpt-4o" si tienes acceso
-            messages=[{"role": "user", "content": user_message}]
-        )
-        chatbot_response = response.choices[0].message['content']
-        logging.info(f"Respuesta del chatbot: {chatbot_response}")
-        return jsonify({"response": chatbot_response})
-    except Exception as e:
-        logging.error(f"Error al comunicarse con la API de OpenAI: {e}")
-        return jsonify({"error": f"Error al obtener respuesta del chatbot: {str(e)}"}), 500
+    payload, status = responder_chatbot(request.json.get('message'))
+    return jsonify(payload), status
+
+# Ruta para consultar el historial de análisis, paginado (?patient_id=...&limit=...&cursor=...)
+@app.route('/history', methods=['GET'])
+def history():
+    payload, status = consultar_historial(request.args.get('patient_id'),
+                                          request.args.get('limit', LIMITE_PAGINA),
+                                          request.args.get('cursor'))
+    return jsonify(payload), status
+
+# Ruta con el informe de tiempos de importación (ms por módulo) para seguir el presupuesto de arranque
+@app.route('/startup-report', methods=['GET'])
+def startup_report():
+    informe = informe_importaciones()
+    return jsonify({"modulos_ms": informe, "total_ms": round(sum(informe.values()), 1)})
 
 # --- Punto de entrada para ejecutar la aplicación Flask ---
 if __name__ == '__main__':
-    # Para desarrollo, ejecuta con debug=True.
-    # En producción, usa un servidor WSGI como Gunicorn (ej: gunicorn -w 4 -b 0.0.0.0:5000 app:app)
-    app.run(debug=True, host='0.0.0.0', port=5000)
-
-
-
-            
-    
-    
-
-    
-
+    calentar_dependencias()
+    # Servidor de desarrollo (FLASK_DEBUG=1 para activar el modo debug).
+    # En producción, usa un servidor WSGI como Gunicorn (ej: gunicorn -c gunicorn.conf.py app_backend:app)
+    # o la variante ASGI asíncrona (python app_asgi.py)
+    app.run(debug=os.environ.get('FLASK_DEBUG', '0') == '1', host='0.0.0.0', port=5000)
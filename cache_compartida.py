@@ -0,0 +1,221 @@
+"""
+Caché compartida entre sesiones para señales y resultados de procesamiento.
+
+Streamlit ejecuta cada sesión en su propio hilo dentro del mismo proceso; con una única
+`CacheCompartida` por proceso (creada con `st.cache_resource`), varias sesiones que abren
+el mismo registro comparten un solo buffer de señal y un solo resultado en lugar de una
+copia por sesión. Las entradas se indexan por hash del contenido, la memoria total está
+acotada con desalojo LRU y se lleva la cuenta de la memoria que referencia cada sesión.
+"""
+import hashlib
+import sys
+import threading
+import time
+import types
+from collections import OrderedDict
+from collections.abc import Mapping
+
+import numpy as np
+
+# Segundos sin actividad tras los cuales una sesión deja de aparecer en la contabilidad
+INACTIVIDAD_SESION_S = 3600
+
+
+def hash_contenido(*partes):
+    """
+    Calcula un hash estable del contenido de `partes` (arrays, bytes o valores simples).
+
+    Los arrays se hashean por su buffer (sin copiar si ya son contiguos), tipo y forma.
+
+    Returns:
+        str: Resumen hexadecimal BLAKE2b de 128 bits.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for parte in partes:
+        if isinstance(parte, np.ndarray):
+            array = np.ascontiguousarray(parte)
+            h.update(f"{array.dtype.str}{array.shape}".encode())
+            h.update(memoryview(array).cast("B"))
+        elif isinstance(parte, (bytes, bytearray, memoryview)):
+            h.update(parte)
+        else:
+            h.update(repr(parte).encode())
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def tamano_en_bytes(valor):
+    """Estima la memoria ocupada por `valor` (arrays, DataFrames y contenedores anidados)."""
+    if isinstance(valor, np.ndarray):
+        return valor.nbytes
+    if hasattr(valor, "memory_usage") and callable(valor.memory_usage):
+        # pd.DataFrame / pd.Series
+        uso = valor.memory_usage(deep=True)
+        return int(uso.sum()) if hasattr(uso, "sum") else int(uso)
+    if isinstance(valor, Mapping):
+        return sys.getsizeof(valor) + sum(tamano_en_bytes(k) + tamano_en_bytes(v) for k, v in valor.items())
+    if isinstance(valor, (list, tuple)):
+        return sys.getsizeof(valor) + sum(tamano_en_bytes(v) for v in valor)
+    return sys.getsizeof(valor)
+
+
+def _bloquear_array(array):
+    """Marca como no escribible `array` y todos los arrays de los que es vista."""
+    while isinstance(array, np.ndarray):
+        array.setflags(write=False)
+        array = array.base
+
+
+def _solo_lectura(valor):
+    """
+    Devuelve `valor` de solo lectura para compartirlo entre sesiones.
+
+    - Arrays de NumPy: se marcan como no escribibles.
+    - DataFrames/Series de pandas: se marcan como no escribibles los arrays de sus columnas,
+      de modo que cualquier asignación en el sitio (`df.iloc[...] = ...`) falla. pandas no
+      permite congelar la estructura: añadir o sustituir columnas debe hacerse sobre una copia.
+    - Diccionarios: se devuelven como `types.MappingProxyType`; listas y tuplas, como tuplas.
+    """
+    if isinstance(valor, np.ndarray):
+        _bloquear_array(valor)
+    elif hasattr(valor, "_mgr"):
+        # pd.DataFrame / pd.Series: se bloquean los arrays de sus bloques internos, que son
+        # los que pandas modifica en las asignaciones en el sitio
+        for bloque in getattr(valor._mgr, "blocks", ()):
+            if isinstance(bloque.values, np.ndarray):
+                _bloquear_array(bloque.values)
+    elif isinstance(valor, Mapping):
+        return types.MappingProxyType({clave: _solo_lectura(v) for clave, v in valor.items()})
+    elif isinstance(valor, (list, tuple)):
+        return tuple(_solo_lectura(v) for v in valor)
+    return valor
+
+
+class CacheCompartida:
+    """
+    Caché LRU en memoria, segura entre hilos, con límite global de bytes.
+
+    Los valores se comparten entre sesiones y se guardan de solo lectura (ver `_solo_lectura`):
+    arrays y columnas de DataFrames no escribibles, diccionarios como `MappingProxyType`.
+
+    Args:
+        max_bytes (int): Memoria máxima que pueden ocupar todas las entradas.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entradas = OrderedDict()  # clave -> (valor, tamaño en bytes)
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._locks_calculo = {}
+        # sesión -> {"claves": set de claves usadas, "ultimo_acceso": timestamp}
+        self._sesiones = {}
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+
+    def _registrar_uso(self, clave, sesion):
+        if sesion is None:
+            return
+        datos = self._sesiones.setdefault(sesion, {"claves": set(), "ultimo_acceso": 0.0})
+        datos["claves"].add(clave)
+        datos["ultimo_acceso"] = time.time()
+
+    def obtener(self, clave, sesion=None):
+        """Devuelve el valor de `clave` (o None) y lo marca como usado recientemente."""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            self._registrar_uso(clave, sesion)
+            return entrada[0]
+
+    def guardar(self, clave, valor, sesion=None):
+        """
+        Guarda `valor` bajo `clave`, desalojando las entradas menos usadas si hace falta.
+
+        Los valores más grandes que `max_bytes` no se guardan.
+
+        Returns:
+            La versión de solo lectura de `valor` que se comparte entre sesiones.
+        """
+        valor = _solo_lectura(valor)
+        tamano = tamano_en_bytes(valor)
+        with self._lock:
+            if clave in self._entradas:
+                self._bytes -= self._entradas.pop(clave)[1]
+            if tamano > self.max_bytes:
+                return valor
+            while self._entradas and self._bytes + tamano > self.max_bytes:
+                _, (_, tamano_desalojado) = self._entradas.popitem(last=False)
+                self._bytes -= tamano_desalojado
+                self.desalojos += 1
+            self._entradas[clave] = (valor, tamano)
+            self._bytes += tamano
+            self._registrar_uso(clave, sesion)
+        return valor
+
+    def obtener_o_calcular(self, clave, calcular, sesion=None):
+        """
+        Devuelve el valor de `clave`, calculándolo con `calcular()` si no está en caché.
+
+        Si varias sesiones piden a la vez la misma clave, solo una la calcula y el resto
+        espera y reutiliza el resultado.
+        """
+        valor = self.obtener(clave, sesion)
+        if valor is not None:
+            return valor
+        with self._lock:
+            lock_calculo = self._locks_calculo.setdefault(clave, threading.Lock())
+        with lock_calculo:
+            with self._lock:
+                entrada = self._entradas.get(clave)
+                if entrada is not None:
+                    self._entradas.move_to_end(clave)
+                    self._registrar_uso(clave, sesion)
+                    return entrada[0]
+            try:
+                return self.guardar(clave, calcular(), sesion)
+            finally:
+                with self._lock:
+                    self._locks_calculo.pop(clave, None)
+
+    def uso_sesiones(self):
+        """
+        Contabilidad de memoria por sesión.
+
+        Returns:
+            dict: {sesión: {"entradas": n, "bytes": memoria referenciada, "ultimo_acceso": timestamp}},
+                solo con las entradas que siguen en caché y las sesiones activas recientemente.
+                Una misma entrada compartida cuenta en todas las sesiones que la usan.
+        """
+        limite = time.time() - INACTIVIDAD_SESION_S
+        with self._lock:
+            for sesion in [s for s, d in self._sesiones.items() if d["ultimo_acceso"] < limite]:
+                del self._sesiones[sesion]
+            uso = {}
+            for sesion, datos in self._sesiones.items():
+                datos["claves"] &= self._entradas.keys()
+                uso[sesion] = {
+                    "entradas": len(datos["claves"]),
+                    "bytes": sum(self._entradas[clave][1] for clave in datos["claves"]),
+                    "ultimo_acceso": datos["ultimo_acceso"],
+                }
+            return uso
+
+    def estadisticas(self):
+        """Devuelve el uso global de la caché."""
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._entradas),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": self.aciertos / consultas if consultas else 0.0,
+                "desalojos": self.desalojos,
+            }
@@ -0,0 +1,189 @@
+"""
+Cribado de irregularidad del ritmo (posible fibrilación auricular) sobre intervalos RR.
+
+Las características se calculan en ventanas deslizantes de latidos como operaciones
+vectorizadas de NumPy sobre vistas con stride (`sliding_window_view`), sin bucles por ventana:
+- RMSSD normalizado por el RR medio
+- Ratio de puntos de inflexión (TPR)
+- Entropía muestral (SampEn, m=2, r=0.2·SD)
+- Poincaré SD1, SD2 y SD1/SD2
+
+Las ventanas con RMSSD normalizado alto que cumplen además suficientes criterios se marcan
+como irregulares, y las ventanas irregulares solapadas se agrupan en episodios con instante
+de inicio y fin.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Tamaño y paso de las ventanas, en latidos
+VENTANA_LATIDOS = 64
+PASO_LATIDOS = 16
+# Con menos RR que esto no se hace cribado (las características no son fiables)
+MIN_LATIDOS = 16
+
+# Parámetros de la entropía muestral
+SAMPEN_M = 2
+SAMPEN_R = 0.2
+
+# Umbrales de irregularidad (Dash et al. 2009 para nRMSSD y TPR)
+UMBRAL_RMSSD_NORMALIZADO = 0.1
+TPR_ALEATORIO = (0.54, 0.77)
+UMBRAL_SAMPEN = 1.5
+UMBRAL_SD1_SD2 = 0.6
+# Además del RMSSD normalizado, número mínimo de criterios (de TPR, SampEn y SD1/SD2)
+# que debe cumplir una ventana para marcarla como irregular
+MIN_CRITERIOS_ADICIONALES = 2
+
+# Ventanas procesadas a la vez en la entropía muestral (limita la memoria de las matrices de distancias)
+BLOQUE_SAMPEN = 256
+
+
+def _entropia_muestral(ventanas, m=SAMPEN_M, r=SAMPEN_R):
+    """
+    Entropía muestral de cada fila de `ventanas` (forma [n_ventanas, L]).
+
+    Se comparan las N - m plantillas de longitud m y m + 1 con la distancia de Chebyshev,
+    excluyendo autocomparaciones, con tolerancia r · SD de cada ventana.
+    """
+    n_ventanas, longitud = ventanas.shape
+    n_plantillas = longitud - m
+    triangulo = np.triu(np.ones((n_plantillas, n_plantillas), dtype=bool), k=1)
+    sampen = np.full(n_ventanas, np.nan)
+
+    for inicio in range(0, n_ventanas, BLOQUE_SAMPEN):
+        bloque = ventanas[inicio:inicio + BLOQUE_SAMPEN].astype(np.float32)
+        tolerancia = (r * bloque.std(axis=1, ddof=1))[:, None, None]
+        # distancia_m[v, i, j] = max_k |x[i + k] - x[j + k]| para k < m
+        distancia_m = np.zeros((len(bloque), n_plantillas, n_plantillas), dtype=np.float32)
+        for k in range(m):
+            columna = bloque[:, k:k + n_plantillas]
+            np.maximum(distancia_m, np.abs(columna[:, :, None] - columna[:, None, :]), out=distancia_m)
+        columna = bloque[:, m:m + n_plantillas]
+        distancia_m1 = np.maximum(distancia_m, np.abs(columna[:, :, None] - columna[:, None, :]))
+
+        coincidencias_m = ((distancia_m <= tolerancia) & triangulo).sum(axis=(1, 2))
+        coincidencias_m1 = ((distancia_m1 <= tolerancia) & triangulo).sum(axis=(1, 2))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sampen[inicio:inicio + len(bloque)] = np.where(
+                (coincidencias_m > 0) & (coincidencias_m1 > 0),
+                -np.log(coincidencias_m1 / coincidencias_m),
+                np.nan,
+            )
+    return sampen
+
+
+def caracteristicas_ventanas(rr, ventana=VENTANA_LATIDOS, paso=PASO_LATIDOS):
+    """
+    Calcula las características de irregularidad en ventanas deslizantes de RR.
+
+    Si el paso no encaja exactamente con la longitud del registro, se añade una última
+    ventana alineada con el final, para que los últimos RR también se criben.
+
+    Args:
+        rr (np.array): Intervalos RR en segundos.
+        ventana (int): Latidos por ventana.
+        paso (int): Desplazamiento entre ventanas, en latidos.
+
+    Returns:
+        dict: Arrays por ventana: "inicio" (índice del primer RR), "RR medio (s)",
+            "RMSSD normalizado", "TPR", "SampEn", "SD1 (ms)", "SD2 (ms)" y "SD1/SD2".
+    """
+    rr = np.asarray(rr, dtype=np.float64)
+    inicios = np.arange(0, len(rr) - ventana + 1, paso)
+    if inicios[-1] != len(rr) - ventana:
+        inicios = np.append(inicios, len(rr) - ventana)
+    ventanas = sliding_window_view(rr, ventana)[inicios]
+    diferencias = np.diff(ventanas, axis=1)
+
+    media = ventanas.mean(axis=1)
+    rmssd = np.sqrt(np.mean(diferencias ** 2, axis=1))
+    # Punto de inflexión: el RR central es máximo o mínimo local
+    tpr = (diferencias[:, :-1] * diferencias[:, 1:] < 0).sum(axis=1) / (ventana - 2)
+    sd1 = diferencias.std(axis=1, ddof=1) / np.sqrt(2)
+    sd2 = np.sqrt(np.maximum(2 * ventanas.var(axis=1, ddof=1) - sd1 ** 2, 0.0))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "inicio": inicios,
+            "RR medio (s)": media,
+            "RMSSD normalizado": rmssd / media,
+            "TPR": tpr,
+            "SampEn": _entropia_muestral(ventanas),
+            "SD1 (ms)": sd1 * 1000,
+            "SD2 (ms)": sd2 * 1000,
+            "SD1/SD2": sd1 / sd2,
+        }
+
+
+def ventanas_irregulares(caracteristicas):
+    """
+    Marca como irregulares las ventanas con RMSSD normalizado alto que además cumplen
+    al menos MIN_CRITERIOS_ADICIONALES de los criterios de TPR, SampEn y SD1/SD2.
+    """
+    adicionales = (
+        ((caracteristicas["TPR"] >= TPR_ALEATORIO[0]) & (caracteristicas["TPR"] <= TPR_ALEATORIO[1])).astype(int)
+        + (caracteristicas["SampEn"] > UMBRAL_SAMPEN)
+        + (caracteristicas["SD1/SD2"] > UMBRAL_SD1_SD2)
+    )
+    return (caracteristicas["RMSSD normalizado"] > UMBRAL_RMSSD_NORMALIZADO) & (adicionales >= MIN_CRITERIOS_ADICIONALES)
+
+
+def _episodios(irregular, inicios, ventana, t_picos):
+    """Agrupa ventanas irregulares solapadas o contiguas en episodios (inicio/fin en segundos)."""
+    episodios = []
+    if not irregular.any():
+        return episodios
+    primeros = inicios[irregular]
+    ultimos = primeros + ventana  # índice del pico que cierra el último RR de la ventana
+    # Un nuevo episodio empieza cuando la ventana no solapa con el final del anterior
+    nuevo = np.concatenate(([True], primeros[1:] > np.maximum.accumulate(ultimos)[:-1]))
+    for grupo in np.split(np.arange(len(primeros)), np.flatnonzero(nuevo)[1:]):
+        i_inicio = primeros[grupo[0]]
+        i_fin = ultimos[grupo].max()
+        episodios.append({
+            "inicio_s": float(t_picos[i_inicio]),
+            "fin_s": float(t_picos[i_fin]),
+            "latidos": int(i_fin - i_inicio),
+        })
+    return episodios
+
+
+def cribar_arritmias(peaks, sampling_rate, ventana=VENTANA_LATIDOS, paso=PASO_LATIDOS):
+    """
+    Cribado de irregularidad del ritmo a partir de los picos R.
+
+    Si el registro tiene menos RR que `ventana` (pero al menos MIN_LATIDOS) se analiza
+    como una única ventana.
+
+    Args:
+        peaks (array-like): Índices de los picos R (p. ej. info["ECG_R_Peaks"]).
+        sampling_rate (int): Frecuencia de muestreo de `peaks` en Hz.
+        ventana (int): Latidos por ventana.
+        paso (int): Desplazamiento entre ventanas, en latidos.
+
+    Returns:
+        dict | None: None si hay muy pocos latidos; si no, un diccionario con
+            "caracteristicas" (ver `caracteristicas_ventanas`), "irregular" (bool por ventana),
+            "episodios" (lista de {"inicio_s", "fin_s", "latidos"}) y "carga_irregular"
+            (fracción del registro, 0-1, cubierta por episodios).
+    """
+    peaks = np.asarray(peaks, dtype=np.float64)
+    peaks = peaks[np.isfinite(peaks)]
+    t_picos = peaks / sampling_rate
+    rr = np.diff(t_picos)
+    if len(rr) < MIN_LATIDOS:
+        return None
+
+    ventana = min(ventana, len(rr))
+    caracteristicas = caracteristicas_ventanas(rr, ventana, paso)
+    irregular = ventanas_irregulares(caracteristicas)
+    episodios = _episodios(irregular, caracteristicas["inicio"], ventana, t_picos)
+
+    duracion = t_picos[-1] - t_picos[0]
+    carga = sum(e["fin_s"] - e["inicio_s"] for e in episodios) / duracion if duracion > 0 else 0.0
+    return {
+        "caracteristicas": caracteristicas,
+        "irregular": irregular,
+        "episodios": episodios,
+        "carga_irregular": carga,
+    }
@@ -0,0 +1,278 @@
+import io
+import json
+import zipfile
+
+import numpy as np
+
+# Número de filas que se escriben en cada bloque (record batch / fragmento NPZ)
+TAMANO_BLOQUE = 65536
+
+# Sufijos de las columnas de NeuroKit2 que solo contienen marcas 0/1 de picos/ondas
+SUFIJOS_MARCAS = ("_Peaks", "_Onsets", "_Offsets")
+
+FORMATOS_EXPORTACION = {
+    "Parquet": {"extension": "parquet", "mime": "application/vnd.apache.parquet"},
+    "Arrow IPC": {"extension": "arrow", "mime": "application/vnd.apache.arrow.file"},
+    "NPZ (NumPy)": {"extension": "npz", "mime": "application/octet-stream"},
+}
+
+
+def es_columna_marca(nombre):
+    """Indica si una columna de `signals` es una marca binaria de picos (ECG_R_Peaks, etc.)."""
+    return nombre.endswith(SUFIJOS_MARCAS)
+
+
+def _columnas_reducidas(signals, inicio, fin):
+    """
+    Devuelve las columnas de un bloque de `signals` con tipos reducidos.
+
+    Las columnas de marcas se convierten a booleanos y el resto a float32.
+
+    Args:
+        signals (pd.DataFrame): DataFrame devuelto por `nk.ecg_process`.
+        inicio (int): Primera fila del bloque.
+        fin (int): Fila final (excluida) del bloque.
+
+    Returns:
+        dict: Diccionario {nombre de columna: np.array}.
+    """
+    columnas = {}
+    for nombre in signals.columns:
+        valores = signals[nombre].to_numpy()[inicio:fin]
+        if es_columna_marca(nombre):
+            columnas[nombre] = valores.astype(bool)
+        else:
+            columnas[nombre] = valores.astype(np.float32)
+    return columnas
+
+
+def anotaciones_info(info):
+    """
+    Separa el diccionario `info` de NeuroKit2 en anotaciones (índices de muestras)
+    y metadatos escalares.
+
+    Los índices se guardan como int32; los NaN (ondas no detectadas) se codifican como -1.
+    Los arrays no enteros (p. ej. los diagnósticos ECG_fixpeaks_*) se guardan como float32.
+
+    Args:
+        info (dict): Diccionario `info` devuelto por `nk.ecg_process`.
+
+    Returns:
+        tuple: (anotaciones, metadatos) donde `anotaciones` es un dict de np.array
+            (int32 o float32) y `metadatos` un dict serializable a JSON.
+    """
+    anotaciones = {}
+    metadatos = {}
+    for clave, valor in info.items():
+        if isinstance(valor, (list, tuple, np.ndarray)):
+            array = np.asarray(valor, dtype=np.float64)
+            finitos = np.isfinite(array)
+            if np.array_equal(array[finitos], np.round(array[finitos])):
+                anotaciones[clave] = np.where(finitos, array, -1).astype(np.int32)
+            else:
+                anotaciones[clave] = array.astype(np.float32)
+        elif isinstance(valor, (np.integer, np.floating)):
+            metadatos[clave] = valor.item()
+        elif isinstance(valor, (int, float, str, bool)) or valor is None:
+            metadatos[clave] = valor
+    return anotaciones, metadatos
+
+
+def _metadatos_arrow(info):
+    """Serializa anotaciones y metadatos de `info` como metadatos de esquema Arrow."""
+    anotaciones, metadatos = anotaciones_info(info)
+    return {
+        b"ecg_info": json.dumps(metadatos).encode("utf-8"),
+        b"ecg_anotaciones": json.dumps(
+            {clave: valores.tolist() for clave, valores in anotaciones.items()}
+        ).encode("utf-8"),
+    }
+
+
+def _esquema_arrow(signals, info):
+    """Construye el esquema Arrow (float32 / bool) para `signals`."""
+    import pyarrow as pa
+
+    campos = [
+        pa.field(nombre, pa.bool_() if es_columna_marca(nombre) else pa.float32())
+        for nombre in signals.columns
+    ]
+    return pa.schema(campos, metadata=_metadatos_arrow(info))
+
+
+def _bloques_arrow(signals, esquema, tamano_bloque):
+    """Genera record batches de `signals` de `tamano_bloque` filas."""
+    import pyarrow as pa
+
+    for inicio in range(0, len(signals), tamano_bloque):
+        columnas = _columnas_reducidas(signals, inicio, inicio + tamano_bloque)
+        yield pa.RecordBatch.from_arrays(
+            [pa.array(columnas[nombre]) for nombre in esquema.names], schema=esquema
+        )
+
+
+def exportar_parquet(signals, info, destino, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Escribe `signals` e `info` en formato Parquet, bloque a bloque.
+
+    Las marcas de picos se guardan como booleanos (Parquet las empaqueta a nivel de bit)
+    y las anotaciones de `info` como metadatos del esquema.
+
+    Args:
+        signals (pd.DataFrame): DataFrame devuelto por `nk.ecg_process`.
+        info (dict): Diccionario `info` devuelto por `nk.ecg_process`.
+        destino (str | file-like): Ruta o archivo binario de salida.
+        tamano_bloque (int): Filas por grupo de filas.
+    """
+    import pyarrow.parquet as pq
+
+    esquema = _esquema_arrow(signals, info)
+    with pq.ParquetWriter(destino, esquema, compression="zstd") as writer:
+        for bloque in _bloques_arrow(signals, esquema, tamano_bloque):
+            writer.write_batch(bloque)
+
+
+def exportar_arrow(signals, info, destino, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Escribe `signals` e `info` en formato Arrow IPC (archivo), bloque a bloque.
+
+    Args:
+        signals (pd.DataFrame): DataFrame devuelto por `nk.ecg_process`.
+        info (dict): Diccionario `info` devuelto por `nk.ecg_process`.
+        destino (str | file-like): Ruta o archivo binario de salida.
+        tamano_bloque (int): Filas por record batch.
+    """
+    import pyarrow as pa
+
+    esquema = _esquema_arrow(signals, info)
+    opciones = pa.ipc.IpcWriteOptions(compression="zstd")
+    with pa.ipc.new_file(destino, esquema, options=opciones) as writer:
+        for bloque in _bloques_arrow(signals, esquema, tamano_bloque):
+            writer.write_batch(bloque)
+
+
+def _escribir_array_npz(zf, nombre, dtype, longitud, bloques):
+    """
+    Escribe un array `.npy` dentro de un ZIP a partir de bloques, sin concatenarlos en memoria.
+
+    Args:
+        zf (zipfile.ZipFile): Archivo ZIP abierto en modo escritura.
+        nombre (str): Nombre del array (sin extensión).
+        dtype (np.dtype): Tipo del array.
+        longitud (int): Número total de elementos.
+        bloques (iterable): Bloques 1-D de `dtype` cuya longitud total es `longitud`.
+    """
+    with zf.open(f"{nombre}.npy", "w", force_zip64=True) as f:
+        cabecera = {"descr": np.lib.format.dtype_to_descr(np.dtype(dtype)),
+                    "fortran_order": False, "shape": (longitud,)}
+        np.lib.format.write_array_header_1_0(f, cabecera)
+        for bloque in bloques:
+            f.write(np.ascontiguousarray(bloque, dtype=dtype).tobytes())
+
+
+def exportar_npz(signals, info, destino, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Escribe `signals` e `info` como archivo `.npz` comprimido, columna a columna y por bloques.
+
+    Las columnas continuas se guardan como float32. Las marcas de picos se empaquetan a nivel
+    de bit con `np.packbits`; `n_muestras` permite recuperarlas con
+    `np.unpackbits(arr, count=n_muestras)`. Las anotaciones de `info` se guardan como
+    arrays `info_<clave>` y los metadatos escalares en `info_json`.
+
+    Args:
+        signals (pd.DataFrame): DataFrame devuelto por `nk.ecg_process`.
+        info (dict): Diccionario `info` devuelto por `nk.ecg_process`.
+        destino (str | file-like): Ruta o archivo binario de salida.
+        tamano_bloque (int): Filas por bloque (se redondea a múltiplo de 8).
+    """
+    n_muestras = len(signals)
+    # Los bloques de marcas deben ser múltiplos de 8 para que packbits no introduzca relleno intermedio
+    tamano_bloque = max(8, tamano_bloque - tamano_bloque % 8)
+    anotaciones, metadatos = anotaciones_info(info)
+
+    with zipfile.ZipFile(destino, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("n_muestras.npy", _npy_bytes(np.array(n_muestras, dtype=np.int64)))
+        for nombre in signals.columns:
+            valores = signals[nombre].to_numpy()
+            if es_columna_marca(nombre):
+                bloques = (np.packbits(valores[i:i + tamano_bloque].astype(bool))
+                           for i in range(0, n_muestras, tamano_bloque))
+                _escribir_array_npz(zf, nombre, np.uint8, (n_muestras + 7) // 8, bloques)
+            else:
+                bloques = (valores[i:i + tamano_bloque]
+                           for i in range(0, n_muestras, tamano_bloque))
+                _escribir_array_npz(zf, nombre, np.float32, n_muestras, bloques)
+        for clave, valores in anotaciones.items():
+            zf.writestr(f"info_{clave}.npy", _npy_bytes(valores))
+        zf.writestr("info_json.npy", _npy_bytes(np.array(json.dumps(metadatos))))
+
+
+def importar_npz(origen):
+    """
+    Lee un archivo escrito por `exportar_npz` y reconstruye `signals` e `info`.
+
+    Las columnas continuas se devuelven como float64 (con la precisión float32 con la que
+    se guardaron) y las marcas como enteros 0/1. En las anotaciones, los -1 vuelven a ser NaN.
+
+    Args:
+        origen (str | file-like): Ruta o archivo binario `.npz`.
+
+    Returns:
+        tuple: (signals, info) con el mismo formato que `nk.ecg_process`.
+    """
+    import pandas as pd
+
+    with np.load(origen, allow_pickle=False) as npz:
+        n_muestras = int(npz["n_muestras"])
+        columnas = {}
+        info = json.loads(str(npz["info_json"]))
+        for nombre in npz.files:
+            if nombre in ("n_muestras", "info_json"):
+                continue
+            valores = npz[nombre]
+            if nombre.startswith("info_"):
+                if np.issubdtype(valores.dtype, np.floating):
+                    anotacion = valores.astype(np.float64)
+                else:
+                    anotacion = valores.astype(np.int64)
+                    if (anotacion < 0).any():
+                        anotacion = np.where(anotacion < 0, np.nan, anotacion)
+                info[nombre[len("info_"):]] = anotacion
+            elif es_columna_marca(nombre):
+                columnas[nombre] = np.unpackbits(valores, count=n_muestras).astype(np.int64)
+            else:
+                columnas[nombre] = valores.astype(np.float64)
+    return pd.DataFrame(columnas), info
+
+
+def _npy_bytes(array):
+    """Serializa un array pequeño en formato `.npy`."""
+    buffer = io.BytesIO()
+    np.save(buffer, array, allow_pickle=False)
+    return buffer.getvalue()
+
+
+EXPORTADORES = {
+    "Parquet": exportar_parquet,
+    "Arrow IPC": exportar_arrow,
+    "NPZ (NumPy)": exportar_npz,
+}
+
+
+def exportar_senales(signals, info, formato, destino, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Exporta la señal procesada y sus anotaciones en el formato indicado.
+
+    Args:
+        signals (pd.DataFrame): DataFrame devuelto por `nk.ecg_process`.
+        info (dict): Diccionario `info` devuelto por `nk.ecg_process`.
+        formato (str): Una de las claves de `FORMATOS_EXPORTACION`.
+        destino (str | file-like): Ruta o archivo binario de salida.
+        tamano_bloque (int): Filas por bloque.
+
+    Raises:
+        ValueError: Si el formato no está soportado.
+    """
+    if formato not in EXPORTADORES:
+        raise ValueError(f"Formato de exportación no soportado: {formato}")
+    EXPORTADORES[formato](signals, info, destino, tamano_bloque=tamano_bloque)
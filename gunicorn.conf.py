@@ -0,0 +1,22 @@
+# Configuración de Gunicorn para el backend Flask (app_backend.py) o su variante ASGI (app_asgi.py)
+# Uso: gunicorn -c gunicorn.conf.py app_backend:app
+#      GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker gunicorn -c gunicorn.conf.py app_asgi:app
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+# Segundos que se mantiene abierta una conexión keep-alive inactiva
+keepalive = int(os.environ.get('KEEPALIVE_S', '75'))
+
+# No se precarga la aplicación en el proceso maestro: cada worker arranca rápido
+# y carga los SDKs pesados en segundo plano cuando ya acepta conexiones.
+preload_app = False
+
+
+def post_worker_init(worker):
+    # El socket ya está abierto (lo comparte el maestro); lanza la precarga en segundo plano
+    from app_backend import calentar_dependencias
+    calentar_dependencias()
@@ -0,0 +1,417 @@
+"""
+Historial persistente de análisis de ECG (SQLite).
+
+Guarda dos tipos de filas:
+- `resultados`: el resultado completo de procesar un registro, indexado por el hash de su
+  contenido y el origen del análisis ("senal", "imagen_vertex", ...). Permite saltarse el
+  procesamiento de un registro ya analizado.
+- `analisis`: cada análisis realizado (hash, ID de paciente, nombre, instante y un resumen
+  JSON de las métricas), con índices por hash y por paciente para consultar el historial
+  de un paciente de forma paginada. No hay consulta de todos los pacientes a la vez.
+
+Los datos binarios de un resultado (p. ej. la señal procesada en NPZ) no se guardan en la
+base de datos: se escriben en archivos del directorio `datos/` junto a ella y el resultado
+guarda solo la ruta.
+
+Las escrituras se acumulan en memoria y un hilo en segundo plano las vuelca en lotes, cada
+uno en una única transacción; las lecturas ven también las escrituras aún no volcadas.
+
+Si la base de datos no se puede abrir, `obtener_historial` devuelve None y la aplicación
+analiza normalmente sin guardar historial.
+
+Configuración (variables de entorno):
+    ECG_HISTORIAL_DB            Ruta de la base de datos (~/.ecg_app/historial_ecg.sqlite3)
+    ECG_HISTORIAL_MAX_DATOS_MB  Tamaño máximo de un archivo de datos; los mayores no se guardan (256)
+"""
+import atexit
+import json
+import logging
+import math
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+RUTA_HISTORIAL = os.environ.get(
+    "ECG_HISTORIAL_DB", os.path.join(os.path.expanduser("~"), ".ecg_app", "historial_ecg.sqlite3"))
+
+MAX_DATOS_BYTES = int(float(os.environ.get("ECG_HISTORIAL_MAX_DATOS_MB", "256")) * 1024 * 1024)
+
+# Escrituras pendientes que fuerzan un volcado inmediato
+TAMANO_LOTE = 64
+# Segundos máximos que una escritura espera en memoria antes de volcarse
+INTERVALO_VOLCADO_S = 1.0
+# Filas por página del historial
+LIMITE_PAGINA = 20
+LIMITE_PAGINA_MAX = 200
+# Los análisis aún no volcados (sin id) se ordenan como los últimos de su instante
+ID_PENDIENTE = 2**63 - 1
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS resultados (
+    hash_registro TEXT NOT NULL,
+    origen TEXT NOT NULL,
+    creado REAL NOT NULL,
+    resultado TEXT NOT NULL,
+    PRIMARY KEY (hash_registro, origen)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS analisis (
+    id INTEGER PRIMARY KEY,
+    hash_registro TEXT NOT NULL,
+    origen TEXT NOT NULL,
+    paciente_id TEXT,
+    nombre TEXT,
+    creado REAL NOT NULL,
+    resumen TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_analisis_hash ON analisis (hash_registro, origen);
+CREATE INDEX IF NOT EXISTS idx_analisis_paciente ON analisis (paciente_id, creado, id);
+"""
+
+
+SQL_RESULTADO = ("INSERT OR REPLACE INTO resultados (hash_registro, origen, creado, resultado) "
+                 "VALUES (?, ?, ?, ?)")
+SQL_ANALISIS = ("INSERT INTO analisis (hash_registro, origen, paciente_id, nombre, creado, resumen) "
+                "VALUES (?, ?, ?, ?, ?, ?)")
+
+
+def a_json(valor):
+    """
+    Convierte `valor` en una estructura serializable a JSON estándar.
+
+    Los tipos de NumPy pasan a tipos de Python y los NaN/infinitos a None.
+    """
+    if isinstance(valor, dict):
+        return {str(clave): a_json(v) for clave, v in valor.items()}
+    if isinstance(valor, (list, tuple, np.ndarray)):
+        return [a_json(v) for v in valor]
+    if isinstance(valor, np.generic):
+        valor = valor.item()
+    if isinstance(valor, float) and not math.isfinite(valor):
+        return None
+    return valor
+
+
+def _codificar_cursor(creado, id_analisis):
+    return f"{creado!r}_{id_analisis}"
+
+
+def _decodificar_cursor(cursor):
+    """
+    Raises:
+        ValueError: Si el cursor no tiene el formato devuelto por `historial`.
+    """
+    creado, id_analisis = cursor.rsplit("_", 1)
+    return float(creado), int(id_analisis)
+
+
+class HistorialAnalisis:
+    """
+    Almacén de análisis en SQLite con escrituras por lotes.
+
+    Es seguro entre hilos: cada hilo lector usa su propia conexión y las escrituras las
+    hace un único hilo en segundo plano.
+
+    Args:
+        ruta (str): Ruta del archivo SQLite.
+        tamano_lote (int): Escrituras pendientes que fuerzan un volcado.
+        intervalo_s (float): Tiempo máximo entre volcados.
+        max_datos_bytes (int): Tamaño máximo de un archivo de `guardar_datos`.
+    """
+
+    def __init__(self, ruta=RUTA_HISTORIAL, tamano_lote=TAMANO_LOTE, intervalo_s=INTERVALO_VOLCADO_S,
+                 max_datos_bytes=MAX_DATOS_BYTES):
+        self.ruta = ruta
+        self.tamano_lote = tamano_lote
+        self.intervalo_s = intervalo_s
+        self.max_datos_bytes = max_datos_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._lock_volcado = threading.Lock()
+        # Escrituras aún no volcadas: (hash, origen) -> fila de `resultados`, y filas de `analisis`
+        self._resultados_pendientes = {}
+        self._analisis_pendientes = []
+        self._hay_lote = threading.Event()
+        self._cerrado = False
+
+        directorio = os.path.dirname(os.path.abspath(ruta))
+        os.makedirs(directorio, exist_ok=True)
+        self.directorio_datos = os.path.join(directorio, "datos")
+        with self._conexion() as conexion:
+            conexion.executescript(ESQUEMA)
+        self._hilo = threading.Thread(target=self._bucle_volcado, name="historial-ecg", daemon=True)
+        self._hilo.start()
+
+    def _conexion(self):
+        """Devuelve la conexión SQLite del hilo actual (la crea la primera vez)."""
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.ruta, timeout=30)
+            # WAL: los lectores no se bloquean mientras se escribe un lote
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexion = conexion
+        return conexion
+
+    def guardar_resultado(self, hash_registro, origen, resultado):
+        """
+        Guarda el resultado completo del análisis de un registro (sustituye al anterior).
+
+        Args:
+            hash_registro (str): Hash del contenido del registro.
+            origen (str): Tipo de análisis (p. ej. "senal" o "imagen_vertex").
+            resultado (dict): Resultado serializable a JSON (ver `a_json`). Los datos binarios
+                se guardan antes con `guardar_datos` y el resultado incluye su ruta.
+        """
+        fila = (hash_registro, origen, time.time(), json.dumps(a_json(resultado)))
+        with self._lock:
+            self._resultados_pendientes[(hash_registro, origen)] = fila
+        self._avisar_si_lote()
+
+    def guardar_datos(self, hash_registro, origen, escribir, extension="npz"):
+        """
+        Escribe los datos binarios de un resultado en un archivo del directorio `datos/`.
+
+        Los datos se escriben directamente en el archivo (sin copia en memoria) con un nombre
+        temporal que se renombra al terminar, de modo que nunca se lee un archivo a medio
+        escribir. Si el archivo supera `max_datos_bytes` se descarta.
+
+        Args:
+            hash_registro (str): Hash del contenido del registro.
+            origen (str): Tipo de análisis.
+            escribir (callable): Función que recibe el archivo binario abierto y escribe los datos.
+            extension (str): Extensión del archivo.
+
+        Returns:
+            str | None: Ruta del archivo, o None si supera el tamaño máximo o no se pudo escribir.
+        """
+        nombre = re.sub(r"[^\w.-]", "_", f"{origen}_{hash_registro}.{extension}")
+        ruta = os.path.join(self.directorio_datos, nombre)
+        temporal = None
+        try:
+            os.makedirs(self.directorio_datos, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=self.directorio_datos, suffix=".tmp", delete=False) as archivo:
+                temporal = archivo.name
+                escribir(archivo)
+            tamano = os.path.getsize(temporal)
+            if tamano > self.max_datos_bytes:
+                logging.warning(f"Datos del historial no guardados (hash {hash_registro}, origen {origen}): "
+                                f"{tamano / 1024**2:.1f} MB superan el máximo de "
+                                f"{self.max_datos_bytes / 1024**2:.1f} MB (ECG_HISTORIAL_MAX_DATOS_MB).")
+                return None
+            os.replace(temporal, ruta)
+            temporal = None
+            return ruta
+        except OSError as e:
+            logging.error(f"No se pudieron guardar los datos del historial en {ruta}: {e}")
+            return None
+        finally:
+            if temporal is not None:
+                try:
+                    os.remove(temporal)
+                except OSError:
+                    pass
+
+    def registrar_analisis(self, hash_registro, origen, resumen=None, paciente_id=None, nombre=None):
+        """
+        Añade una entrada al historial.
+
+        Args:
+            hash_registro (str): Hash del contenido del registro analizado.
+            origen (str): Tipo de análisis.
+            resumen (dict, optional): Métricas o diagnóstico que se muestran en el historial.
+            paciente_id (str, optional): Identificador del paciente.
+            nombre (str, optional): Nombre del archivo o descripción del registro.
+        """
+        fila = (hash_registro, origen, paciente_id or None, nombre, time.time(),
+                json.dumps(a_json(resumen)) if resumen is not None else None)
+        with self._lock:
+            self._analisis_pendientes.append(fila)
+        self._avisar_si_lote()
+
+    def _avisar_si_lote(self):
+        with self._lock:
+            pendientes = len(self._resultados_pendientes) + len(self._analisis_pendientes)
+        if pendientes >= self.tamano_lote:
+            self._hay_lote.set()
+
+    def _bucle_volcado(self):
+        while not self._cerrado:
+            self._hay_lote.wait(self.intervalo_s)
+            self._hay_lote.clear()
+            try:
+                self.volcar()
+            except sqlite3.Error as e:
+                logging.error(f"Error al guardar el historial de análisis: {e}")
+
+    def volcar(self):
+        """
+        Escribe en la base de datos todas las escrituras pendientes, en una sola transacción.
+
+        Si el lote falla, se reintenta fila a fila; las filas que siguen fallando se descartan
+        (y se registran en el log) para que no bloqueen las escrituras posteriores.
+        """
+        with self._lock_volcado:
+            with self._lock:
+                resultados = list(self._resultados_pendientes.values())
+                # Las filas siguen visibles como pendientes hasta que se confirman
+                analisis = list(self._analisis_pendientes)
+            if not resultados and not analisis:
+                return
+            conexion = self._conexion()
+            try:
+                with conexion:
+                    conexion.executemany(SQL_RESULTADO, resultados)
+                    conexion.executemany(SQL_ANALISIS, analisis)
+            except sqlite3.Error as e:
+                logging.warning(f"Error al guardar un lote del historial ({e}); se reintenta fila a fila.")
+                self._escribir_filas(conexion, SQL_RESULTADO, resultados)
+                self._escribir_filas(conexion, SQL_ANALISIS, analisis)
+            with self._lock:
+                # Los análisis añadidos durante el volcado están después de los volcados
+                del self._analisis_pendientes[:len(analisis)]
+                # Solo se descartan los resultados que no se han vuelto a modificar durante el volcado
+                for fila in resultados:
+                    if self._resultados_pendientes.get(fila[:2]) is fila:
+                        del self._resultados_pendientes[fila[:2]]
+
+    @staticmethod
+    def _escribir_filas(conexion, sql, filas):
+        """Escribe `filas` una a una, descartando (con un error en el log) las que fallan."""
+        for fila in filas:
+            try:
+                with conexion:
+                    conexion.execute(sql, fila)
+            except sqlite3.Error as e:
+                logging.error(f"Fila del historial descartada (hash {fila[0]}, origen {fila[1]}): {e}")
+
+    def buscar_resultado(self, hash_registro, origen):
+        """
+        Busca el resultado de un registro ya analizado.
+
+        Returns:
+            dict | None: {"resultado": dict, "creado": timestamp}, o None si el registro no se
+                ha analizado (o no se puede leer la base de datos).
+        """
+        with self._lock:
+            fila = self._resultados_pendientes.get((hash_registro, origen))
+        if fila is None:
+            try:
+                fila = self._conexion().execute(
+                    "SELECT hash_registro, origen, creado, resultado FROM resultados "
+                    "WHERE hash_registro = ? AND origen = ?", (hash_registro, origen)).fetchone()
+            except sqlite3.Error as e:
+                # Sin historial se analiza de nuevo, como si el registro no estuviera guardado
+                logging.error(f"Error al consultar el historial de análisis: {e}")
+                return None
+        if fila is None:
+            return None
+        return {"resultado": json.loads(fila[3]), "creado": fila[2]}
+
+    def historial(self, paciente_id, limite=LIMITE_PAGINA, cursor=None):
+        """
+        Devuelve una página del historial de un paciente, del análisis más reciente al más antiguo.
+
+        La paginación es por cursor (creado, id), de modo que cada página es una búsqueda
+        en el índice y no depende de cuántas páginas se hayan recorrido antes. Los análisis
+        aún no volcados se mezclan en la página (con "id" None) sin forzar una escritura.
+        Si la página anterior terminó en un análisis pendiente, el cursor filtra solo por
+        `creado`: ese análisis puede haberse volcado entretanto con un id real.
+
+        Args:
+            paciente_id (str): Identificador del paciente.
+            limite (int): Número máximo de filas (como mucho LIMITE_PAGINA_MAX).
+            cursor (str, optional): Valor "siguiente" de la página anterior.
+
+        Returns:
+            dict: {"analisis": [{"id", "hash_registro", "origen", "paciente_id", "nombre",
+                "creado", "resumen"}], "siguiente": cursor de la página siguiente o None}.
+
+        Raises:
+            ValueError: Si falta el paciente o el cursor no es válido.
+            sqlite3.Error: Si no se puede leer la base de datos.
+        """
+        if not paciente_id:
+            raise ValueError("El historial solo se consulta por paciente.")
+        limite = max(1, min(int(limite), LIMITE_PAGINA_MAX))
+        posicion = _decodificar_cursor(cursor) if cursor else None
+        condiciones, parametros = ["paciente_id = ?"], [paciente_id]
+        if posicion and posicion[1] == ID_PENDIENTE:
+            condiciones.append("creado < ?")
+            parametros.append(posicion[0])
+        elif posicion:
+            condiciones.append("(creado, id) < (?, ?)")
+            parametros.extend(posicion)
+        # Los pendientes se leen antes de consultar la base de datos: un análisis volcado
+        # entre ambas lecturas aparece en las dos y se descarta abajo, en lugar de perderse
+        with self._lock:
+            pendientes = list(self._analisis_pendientes)
+        filas = self._conexion().execute(
+            "SELECT id, hash_registro, origen, paciente_id, nombre, creado, resumen FROM analisis "
+            f"WHERE {' AND '.join(condiciones)} ORDER BY creado DESC, id DESC LIMIT ?", (*parametros, limite + 1)).fetchall()
+
+        volcados = {(fila[1], fila[2], fila[3], fila[5]) for fila in filas}
+        for hash_registro, origen, paciente, nombre, creado, resumen in pendientes:
+            if paciente != paciente_id:
+                continue
+            if posicion and (creado, ID_PENDIENTE) >= posicion:
+                continue
+            if (hash_registro, origen, paciente, creado) in volcados:
+                continue
+            filas.append((None, hash_registro, origen, paciente, nombre, creado, resumen))
+        filas.sort(key=lambda fila: (fila[5], ID_PENDIENTE if fila[0] is None else fila[0]), reverse=True)
+
+        analisis = [
+            {"id": fila[0], "hash_registro": fila[1], "origen": fila[2], "paciente_id": fila[3],
+             "nombre": fila[4], "creado": fila[5], "resumen": json.loads(fila[6]) if fila[6] else None}
+            for fila in filas[:limite]
+        ]
+        siguiente = None
+        if len(filas) > limite:
+            ultimo = analisis[-1]
+            siguiente = _codificar_cursor(ultimo["creado"], ID_PENDIENTE if ultimo["id"] is None else ultimo["id"])
+        return {"analisis": analisis, "siguiente": siguiente}
+
+    def cerrar(self):
+        """Vuelca las escrituras pendientes y detiene el hilo de volcado."""
+        self._cerrado = True
+        self._hay_lote.set()
+        self._hilo.join(timeout=5)
+        self.volcar()
+
+
+_historial = None
+_historial_inicializado = False
+_historial_lock = threading.Lock()
+
+
+def obtener_historial():
+    """
+    Devuelve el historial del proceso (abre la base de datos la primera vez).
+
+    Las escrituras pendientes se vuelcan al terminar el proceso.
+
+    Returns:
+        HistorialAnalisis | None: None si la base de datos no se puede abrir; en ese caso
+            los análisis se hacen sin consultar ni guardar historial.
+    """
+    global _historial, _historial_inicializado
+    if _historial_inicializado:
+        return _historial
+    with _historial_lock:
+        if not _historial_inicializado:
+            try:
+                _historial = HistorialAnalisis()
+                atexit.register(_historial.cerrar)
+            except (sqlite3.Error, OSError) as e:
+                logging.error(f"No se pudo abrir el historial de análisis en {RUTA_HISTORIAL}: {e}. "
+                              "Los análisis no se guardarán.")
+                _historial = None
+            _historial_inicializado = True
+    return _historial
@@ -0,0 +1,181 @@
+"""
+HRV en ventana deslizante sobre registros largos (p. ej. Holter de 24 h).
+
+En lugar de llamar a `nk.hrv` para cada ventana, las métricas temporales (MeanHR, SDNN,
+RMSSD, pNN50) se obtienen a partir de sumas acumuladas de los intervalos RR:
+- `HRVMovil` actualiza las métricas en O(1) amortizado por cada latido nuevo (tiempo real).
+- `tendencia_hrv` calcula la tendencia completa de un registro de forma vectorizada.
+"""
+from collections import deque
+
+import numpy as np
+
+# Ventana y paso por defecto de la tendencia (segundos)
+VENTANA_S = 300
+PASO_S = 30
+
+# Umbral de diferencia entre RR sucesivos para pNN50 (ms)
+UMBRAL_NN50_MS = 50
+
+
+def _metricas_desde_sumas(n, s1, s2, s_hr, n_dif, s_d2, n_nn50, referencia):
+    """
+    Calcula las métricas HRV a partir de las sumas de la ventana.
+
+    Las sumas s1 y s2 son de (RR - referencia), lo que evita la cancelación numérica
+    de la fórmula de la varianza con sumas de cuadrados.
+    """
+    media_rr = referencia + s1 / n if n else np.nan
+    sdnn = np.sqrt(max(s2 - s1 * s1 / n, 0.0) / (n - 1)) if n > 1 else np.nan
+    return {
+        "HRV_MeanHR": s_hr / n if n else np.nan,
+        "HRV_MeanNN": media_rr,
+        "HRV_SDNN": sdnn,
+        "HRV_RMSSD": np.sqrt(s_d2 / n_dif) if n_dif else np.nan,
+        "HRV_pNN50": 100.0 * n_nn50 / n_dif if n_dif else np.nan,
+    }
+
+
+class HRVMovil:
+    """
+    Métricas HRV en una ventana deslizante de `ventana_s` segundos, actualizadas latido a latido.
+
+    Cada llamada a `agregar_latido` añade un intervalo RR y descarta los que han salido de
+    la ventana, ajustando las sumas acumuladas; el coste es O(1) amortizado por latido.
+
+    Ejemplo:
+        hrv = HRVMovil(ventana_s=300)
+        for t in tiempos_picos_r:
+            hrv.agregar_latido(t)
+        hrv.metricas()  # {"HRV_MeanHR": ..., "HRV_SDNN": ..., "HRV_RMSSD": ..., "HRV_pNN50": ...}
+    """
+
+    def __init__(self, ventana_s=VENTANA_S):
+        self.ventana_s = ventana_s
+        self._ultimo_pico = None
+        self._referencia = None
+        # Cada elemento: [tiempo de fin del RR (s), RR (ms), diferencia con el RR anterior (ms) o None]
+        self._rr = deque()
+        self._n = 0
+        self._s1 = 0.0
+        self._s2 = 0.0
+        self._s_hr = 0.0
+        self._n_dif = 0
+        self._s_d2 = 0.0
+        self._n_nn50 = 0
+
+    def _sumar_diferencia(self, diferencia, signo):
+        self._n_dif += signo
+        self._s_d2 += signo * diferencia * diferencia
+        self._n_nn50 += signo * int(abs(diferencia) > UMBRAL_NN50_MS)
+
+    def agregar_latido(self, t_pico):
+        """
+        Añade un pico R detectado en el instante `t_pico` (segundos, creciente).
+
+        Returns:
+            dict: Métricas de la ventana que termina en `t_pico`.
+        """
+        if self._ultimo_pico is not None:
+            rr = (t_pico - self._ultimo_pico) * 1000.0
+            if self._referencia is None:
+                self._referencia = rr
+            diferencia = rr - self._rr[-1][1] if self._rr else None
+
+            centrado = rr - self._referencia
+            self._n += 1
+            self._s1 += centrado
+            self._s2 += centrado * centrado
+            self._s_hr += 60000.0 / rr
+            if diferencia is not None:
+                self._sumar_diferencia(diferencia, +1)
+            self._rr.append([t_pico, rr, diferencia])
+            self._descartar_antiguos(t_pico - self.ventana_s)
+        self._ultimo_pico = t_pico
+        return self.metricas()
+
+    def _descartar_antiguos(self, t_inicio):
+        """Elimina de la ventana los RR que terminaron en o antes de `t_inicio`."""
+        while self._rr and self._rr[0][0] <= t_inicio:
+            _, rr, diferencia = self._rr.popleft()
+            centrado = rr - self._referencia
+            self._n -= 1
+            self._s1 -= centrado
+            self._s2 -= centrado * centrado
+            self._s_hr -= 60000.0 / rr
+            if diferencia is not None:
+                self._sumar_diferencia(diferencia, -1)
+            # El nuevo primer RR de la ventana ya no tiene RR anterior con el que compararse
+            if self._rr and self._rr[0][2] is not None:
+                self._sumar_diferencia(self._rr[0][2], -1)
+                self._rr[0][2] = None
+
+    def metricas(self):
+        """Devuelve las métricas HRV de la ventana actual (NaN si no hay suficientes latidos)."""
+        return _metricas_desde_sumas(self._n, self._s1, self._s2, self._s_hr,
+                                     self._n_dif, self._s_d2, self._n_nn50, self._referencia or 0.0)
+
+
+def tendencia_hrv(peaks, sampling_rate, ventana_s=VENTANA_S, paso_s=PASO_S):
+    """
+    Calcula la tendencia de MeanHR, SDNN, RMSSD y pNN50 en ventanas deslizantes.
+
+    Usa sumas acumuladas de los RR y `np.searchsorted` para los límites de cada ventana,
+    de modo que el coste es O(latidos + ventanas) en lugar de una llamada a `nk.hrv` por ventana.
+    Un RR pertenece a la ventana (inicio, fin] si su segundo pico cae dentro de ella.
+
+    Args:
+        peaks (array-like): Índices de los picos R (p. ej. info["ECG_R_Peaks"]).
+        sampling_rate (int): Frecuencia de muestreo de `peaks` en Hz.
+        ventana_s (float): Duración de cada ventana en segundos.
+        paso_s (float): Desplazamiento entre ventanas consecutivas en segundos.
+
+    Returns:
+        dict: Arrays "Tiempo (s)" (fin de cada ventana), "HRV_MeanHR", "HRV_MeanNN",
+            "HRV_SDNN", "HRV_RMSSD" y "HRV_pNN50". Vacíos si el registro es más corto que la ventana.
+    """
+    peaks = np.asarray(peaks, dtype=np.float64)
+    peaks = peaks[np.isfinite(peaks)]
+    t_picos = peaks / sampling_rate
+    claves = ["Tiempo (s)", "HRV_MeanHR", "HRV_MeanNN", "HRV_SDNN", "HRV_RMSSD", "HRV_pNN50"]
+    if len(t_picos) < 3 or t_picos[-1] - t_picos[0] < ventana_s:
+        return {clave: np.array([]) for clave in claves}
+
+    rr = np.diff(t_picos) * 1000.0
+    t_rr = t_picos[1:]
+    referencia = rr[0]
+    centrado = rr - referencia
+    diferencias = np.diff(rr)
+
+    def acumulada(valores):
+        return np.concatenate(([0.0], np.cumsum(valores, dtype=np.float64)))
+
+    c1 = acumulada(centrado)
+    c2 = acumulada(centrado * centrado)
+    c_hr = acumulada(60000.0 / rr)
+    c_d2 = acumulada(diferencias * diferencias)
+    c_nn50 = acumulada(np.abs(diferencias) > UMBRAL_NN50_MS)
+
+    fines = np.arange(t_picos[0] + ventana_s, t_picos[-1] + 1e-9, paso_s)
+    inicio = np.searchsorted(t_rr, fines - ventana_s, side="right")
+    fin = np.searchsorted(t_rr, fines, side="right")
+    n = fin - inicio
+    s1 = c1[fin] - c1[inicio]
+    s2 = c2[fin] - c2[inicio]
+    s_hr = c_hr[fin] - c_hr[inicio]
+    # La diferencia k compara rr[k] y rr[k + 1]: dentro de la ventana van de `inicio` a `fin - 2`
+    inicio_dif = np.minimum(inicio, len(diferencias))
+    fin_dif = np.maximum(fin - 1, inicio_dif)
+    n_dif = fin_dif - inicio_dif
+    s_d2 = c_d2[fin_dif] - c_d2[inicio_dif]
+    n_nn50 = c_nn50[fin_dif] - c_nn50[inicio_dif]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return {
+            "Tiempo (s)": fines,
+            "HRV_MeanHR": np.where(n > 0, s_hr / n, np.nan),
+            "HRV_MeanNN": np.where(n > 0, referencia + s1 / n, np.nan),
+            "HRV_SDNN": np.where(n > 1, np.sqrt(np.maximum(s2 - s1 * s1 / n, 0.0) / (n - 1)), np.nan),
+            "HRV_RMSSD": np.where(n_dif > 0, np.sqrt(s_d2 / n_dif), np.nan),
+            "HRV_pNN50": np.where(n_dif > 0, 100.0 * n_nn50 / n_dif, np.nan),
+        }
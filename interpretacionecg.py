@@ -1,9 +1,11 @@
 import numpy as np
 import matplotlib.pyplot as plt
 from scipy.signal import find_peaks, butter, filtfilt
+from remuestreo import FS_CANONICA, remuestrear, indices_a_origen
+from cribado_arritmias import cribar_arritmias
 
-def cargar_ecg:
-    """Carga datos de ECG desde un archivo (simulado aquí)"""
+def cargar_ecg(ruta=None):
+    """Carga datos de ECG desde un archivo (simulado aquí). Devuelve (t, ecg, fs)"""
     # En una aplicación real, cargarías datos reales de un archivo
     # Esto es un ejemplo con datos simulados
     fs = 360  # Frecuencia de muestreo típica (Hz)
@@ -16,7 +18,7 @@ def cargar_ecg:
     for i in range(5, len(t), int(fs * 0.8)):  # ~80 latidos por minuto
         ecg[i:i+20] += 1.5 * np.exp(-0.1 * np.arange(0, 20))
     
-    return t, ecg
+    return t, ecg, fs
 
 def filtrar_ecg(ecg, fs=360):
     """Filtra la señal de ECG para eliminar ruido"""
@@ -42,19 +44,23 @@ def detectar_latidos(ecg, fs=360):
     
     return peaks, heart_rate
 
-def analizar_ecg(t, ecg):
-    """Realiza análisis completo del ECG"""
-    # Filtrar señal
-    ecg_filtrado = filtrar_ecg(ecg)
+def analizar_ecg(t, ecg, fs=360):
+    """Realiza análisis completo del ECG (la señal se procesa a FS_CANONICA)"""
+    # Remuestrear a la frecuencia canónica y filtrar señal
+    ecg_canonica = remuestrear(ecg, fs, FS_CANONICA)
+    ecg_filtrado = filtrar_ecg(ecg_canonica, FS_CANONICA)
     
     # Detectar latidos
-    peaks, heart_rate = detectar_latidos(ecg_filtrado)
+    peaks, heart_rate = detectar_latidos(ecg_filtrado, FS_CANONICA)
     
     # Visualización
+    t_canonica = t[0] + np.arange(len(ecg_filtrado)) / FS_CANONICA
+    # Picos R en índices de la señal original, para marcarlos sobre el ECG crudo
+    peaks_originales = indices_a_origen(peaks, fs, len(ecg), FS_CANONICA)
     plt.figure(figsize=(12, 6))
     plt.plot(t, ecg, label='ECG crudo', alpha=0.5)
-    plt.plot(t, ecg_filtrado, label='ECG filtrado')
-    plt.plot(peaks/360, ecg_filtrado[peaks], "x", label='Picos R detectados')
+    plt.plot(t_canonica, ecg_filtrado, label='ECG filtrado')
+    plt.plot(t[peaks_originales], ecg[peaks_originales], "x", label='Picos R detectados')
     plt.title(f'Análisis de ECG - Frecuencia Cardíaca: {heart_rate:.1f} lpm')
     plt.xlabel('Tiempo (s)')
     plt.ylabel('Amplitud')
@@ -74,13 +80,19 @@ def analizar_ecg(t, ecg):
         print("- Frecuencia cardíaca normal (60-100 lpm)")
     
     if len(peaks) > 0:
-        rr_intervals = np.diff(peaks) / 360
+        rr_intervals = np.diff(peaks) / FS_CANONICA
         rr_variability = np.std(rr_intervals)
         print(f"- Variabilidad RR: {rr_variability:.3f} s")
-        if rr_variability > 0.16:
-            print("  - Variabilidad RR aumentada (posible arritmia)")
+        # Cribado de irregularidad en ventanas deslizantes de RR
+        cribado = cribar_arritmias(peaks, FS_CANONICA)
+        if cribado is None:
+            print("  - Muy pocos latidos para el cribado de arritmias")
+        elif cribado["episodios"]:
+            print(f"  - Ritmo irregular (posible arritmia): {len(cribado['episodios'])} episodio(s)")
+            for episodio in cribado["episodios"]:
+                print(f"    {episodio['inicio_s']:.1f} s - {episodio['fin_s']:.1f} s ({episodio['latidos']} latidos)")
 
 # Ejemplo de uso
 if __name__ == "__main__":
-    t, ecg = cargar_ecg("datos_ecg.txt")  # En la práctica, cargaría datos reales
-    analizar_ecg(t, ecg)
\ No newline at end of file
+    t, ecg, fs = cargar_ecg("datos_ecg.txt")  # En la práctica, cargaría datos reales
+    analizar_ecg(t, ecg, fs)
\ No newline at end of file
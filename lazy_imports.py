@@ -0,0 +1,178 @@
+"""
+Importación diferida de dependencias pesadas (neurokit2, matplotlib, pandas, Vertex AI, OpenAI).
+
+Los módulos se cargan en el primer acceso a uno de sus atributos, y se puede precargarlos
+en segundo plano una vez que el servidor ya está escuchando. Cada carga registra su
+duración para poder seguir un presupuesto de arranque:
+
+    python lazy_imports.py neurokit2 matplotlib.pyplot pandas --presupuesto-ms 4000
+"""
+import argparse
+import importlib
+import logging
+import sys
+import threading
+import time
+
+# Tiempo de importación (ms) de cada módulo cargado a través de este módulo, en orden de carga
+_tiempos_importacion = {}
+_tiempos_lock = threading.Lock()
+
+# Nombres de módulos cuya precarga en segundo plano ya se lanzó en este proceso
+_precargas_lanzadas = set()
+_precargas_lock = threading.Lock()
+
+
+def _importar_cronometrado(nombre):
+    """Importa `nombre` y registra su duración en milisegundos si no estaba ya cargado."""
+    ya_cargado = nombre in sys.modules
+    inicio = time.perf_counter()
+    modulo = importlib.import_module(nombre)
+    if not ya_cargado:
+        with _tiempos_lock:
+            _tiempos_importacion.setdefault(nombre, (time.perf_counter() - inicio) * 1000)
+    return modulo
+
+
+class ModuloDiferido:
+    """
+    Sustituto de un módulo que lo importa en el primer acceso a un atributo.
+
+    Se usa igual que el módulo real (`nk.ecg_process(...)`); la importación se
+    realiza una sola vez aunque varios hilos accedan a la vez.
+    """
+
+    def __init__(self, nombre):
+        object.__setattr__(self, "_nombre", nombre)
+        object.__setattr__(self, "_modulo", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def _cargar(self):
+        modulo = self._modulo
+        if modulo is None:
+            with self._lock:
+                modulo = self._modulo
+                if modulo is None:
+                    modulo = _importar_cronometrado(self._nombre)
+                    object.__setattr__(self, "_modulo", modulo)
+        return modulo
+
+    @property
+    def cargado(self):
+        """Indica si el módulo real ya fue importado."""
+        return self._modulo is not None
+
+    def __getattr__(self, atributo):
+        return getattr(self._cargar(), atributo)
+
+    def __setattr__(self, atributo, valor):
+        setattr(self._cargar(), atributo, valor)
+
+    def __dir__(self):
+        return dir(self._cargar())
+
+    def __repr__(self):
+        estado = "cargado" if self._modulo is not None else "diferido"
+        return f"<módulo {estado} '{self._nombre}'>"
+
+
+def importacion_diferida(nombre):
+    """
+    Devuelve un sustituto de `nombre` que se importa en el primer uso.
+
+    Args:
+        nombre (str): Nombre completo del módulo (ej. "matplotlib.pyplot").
+
+    Returns:
+        ModuloDiferido: Objeto que delega los atributos en el módulo real.
+    """
+    return ModuloDiferido(nombre)
+
+
+def precargar_en_segundo_plano(nombres, retraso=0.0, al_terminar=None):
+    """
+    Importa `nombres` en un hilo demonio, una sola vez por proceso.
+
+    Pensado para llamarse cuando el servidor ya está escuchando, de modo que la
+    primera petición no pague el coste de importación.
+
+    Args:
+        nombres (list): Módulos a precargar, en orden.
+        retraso (float): Segundos de espera antes de empezar.
+        al_terminar (callable, optional): Función sin argumentos a ejecutar tras la precarga.
+
+    Returns:
+        threading.Thread | None: El hilo lanzado, o None si ya se habían precargado.
+    """
+    with _precargas_lock:
+        pendientes = [nombre for nombre in nombres if nombre not in _precargas_lanzadas]
+        if not pendientes:
+            return None
+        _precargas_lanzadas.update(pendientes)
+
+    def _precargar():
+        if retraso:
+            time.sleep(retraso)
+        for nombre in pendientes:
+            try:
+                _importar_cronometrado(nombre)
+            except Exception as e:
+                logging.warning(f"No se pudo precargar el módulo {nombre}: {e}")
+        if al_terminar is not None:
+            try:
+                al_terminar()
+            except Exception as e:
+                logging.warning(f"Error en la función posterior a la precarga: {e}")
+        logging.info(f"Precarga completada: {formatear_informe()}")
+
+    hilo = threading.Thread(target=_precargar, name="precarga-dependencias", daemon=True)
+    hilo.start()
+    return hilo
+
+
+def informe_importaciones():
+    """
+    Devuelve los tiempos de importación registrados.
+
+    Los tiempos son inclusivos: un módulo cuenta también las dependencias que
+    importó por primera vez, por lo que dependen del orden de carga.
+
+    Returns:
+        dict: {nombre del módulo: milisegundos}, en orden de carga.
+    """
+    with _tiempos_lock:
+        return {nombre: round(ms, 1) for nombre, ms in _tiempos_importacion.items()}
+
+
+def formatear_informe(informe=None):
+    """Formatea el informe de importaciones en una sola línea para los logs."""
+    informe = informe_importaciones() if informe is None else informe
+    total = sum(informe.values())
+    detalle = ", ".join(f"{nombre}={ms:.0f}ms" for nombre, ms in informe.items())
+    return f"total={total:.0f}ms ({detalle})"
+
+
+def main(argv=None):
+    """Mide la importación de los módulos indicados y comprueba el presupuesto de arranque."""
+    parser = argparse.ArgumentParser(description="Informe de tiempos de importación (ms) por módulo.")
+    parser.add_argument("modulos", nargs="+", help="Módulos a importar, en orden")
+    parser.add_argument("--presupuesto-ms", type=float, default=None,
+                        help="Falla (código 1) si el tiempo total supera este valor")
+    args = parser.parse_args(argv)
+
+    for nombre in args.modulos:
+        _importar_cronometrado(nombre)
+    informe = informe_importaciones()
+    for nombre, ms in informe.items():
+        print(f"{nombre:<40} {ms:>10.1f} ms")
+    total = sum(informe.values())
+    print(f"{'TOTAL':<40} {total:>10.1f} ms")
+
+    if args.presupuesto_ms is not None and total > args.presupuesto_ms:
+        print(f"Presupuesto de arranque superado: {total:.1f} ms > {args.presupuesto_ms:.1f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
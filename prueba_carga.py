@@ -0,0 +1,233 @@
+"""
+Generador de carga (asyncio) para los endpoints /analyze-ecg y /ask-chatbot del backend.
+
+Envía una mezcla de imágenes de ECG y preguntas al chatbot a una tasa objetivo (RPS) en
+bucle abierto, es decir, las peticiones se lanzan a su hora aunque las anteriores no
+hayan terminado, y reporta latencias p50/p95/p99, rendimiento y desglose de errores.
+
+Uso (con los servicios de servicios_simulados.py y el backend ya arrancados):
+    python prueba_carga.py --url http://127.0.0.1:5000 --rps 20 --duracion 60 --mezcla ecg=0.7,chat=0.3
+
+Requiere aiohttp.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+
+import aiohttp
+
+PREGUNTAS_CHATBOT = [
+    "¿Qué significa un intervalo PR prolongado?",
+    "¿Cuál es la frecuencia cardíaca normal en reposo?",
+    "Explica qué es la fibrilación auricular.",
+    "¿Qué indica un QT largo en un electrocardiograma?",
+    "¿Cuándo debo consultar a un cardiólogo por palpitaciones?",
+]
+
+
+def cargar_imagenes(directorio, n_sinteticas=8, tamano_sintetico=200_000):
+    """
+    Carga las imágenes de ECG a reproducir.
+
+    Args:
+        directorio (str | None): Carpeta con imágenes (.png/.jpg/.jpeg). Si es None se generan
+            imágenes sintéticas de bytes aleatorios (suficiente para el servicio simulado).
+        n_sinteticas (int): Número de imágenes sintéticas.
+        tamano_sintetico (int): Tamaño en bytes de cada imagen sintética.
+
+    Returns:
+        list: Lista de tuplas (nombre de archivo, bytes).
+    """
+    if directorio:
+        imagenes = []
+        for nombre in sorted(os.listdir(directorio)):
+            if nombre.lower().endswith((".png", ".jpg", ".jpeg")):
+                with open(os.path.join(directorio, nombre), "rb") as f:
+                    imagenes.append((nombre, f.read()))
+        if not imagenes:
+            raise ValueError(f"No se encontraron imágenes en {directorio}")
+        return imagenes
+    # La mitad llevan "arritmia" en el nombre para ejercitar también esa rama de la simulación
+    return [(f"ecg_sintetico_{i}{'_arritmia' if i % 2 else ''}.png", os.urandom(tamano_sintetico))
+            for i in range(n_sinteticas)]
+
+
+def parsear_mezcla(texto):
+    """Convierte "ecg=0.7,chat=0.3" en un diccionario de pesos."""
+    mezcla = {}
+    for parte in texto.split(","):
+        tipo, peso = parte.split("=")
+        tipo = tipo.strip()
+        if tipo not in ("ecg", "chat"):
+            raise ValueError(f"Tipo de petición desconocido en la mezcla: {tipo}")
+        mezcla[tipo] = float(peso)
+    return mezcla
+
+
+async def peticion_ecg(sesion, url, imagenes, archivos_por_peticion, imagenes_unicas=True):
+    """
+    Envía una petición multipart a /analyze-ecg y devuelve el estado del resultado.
+
+    Con `imagenes_unicas` se añaden bytes aleatorios a cada imagen para que el backend no
+    pueda devolver el resultado guardado en su historial.
+    """
+    formulario = aiohttp.FormData()
+    for nombre, contenido in random.sample(imagenes, min(archivos_por_peticion, len(imagenes))):
+        if imagenes_unicas:
+            contenido = contenido + os.urandom(16)
+        formulario.add_field("ecg_image", contenido, filename=nombre, content_type="image/png")
+    async with sesion.post(f"{url}/analyze-ecg", data=formulario) as respuesta:
+        cuerpo = await respuesta.read()
+        if respuesta.status != 200:
+            return f"http_{respuesta.status}"
+        resultados = json.loads(cuerpo)
+        # El backend responde 200 aunque falle la inferencia de algún archivo
+        if any(r.get("status") == "error" for r in resultados):
+            return "error_en_resultado"
+        return "ok"
+
+
+async def peticion_chat(sesion, url):
+    """Envía una pregunta a /ask-chatbot y devuelve el estado del resultado."""
+    mensaje = {"message": random.choice(PREGUNTAS_CHATBOT)}
+    async with sesion.post(f"{url}/ask-chatbot", json=mensaje) as respuesta:
+        await respuesta.read()
+        return "ok" if respuesta.status == 200 else f"http_{respuesta.status}"
+
+
+async def ejecutar_carga(url, rps, duracion, mezcla, imagenes, archivos_por_peticion=1,
+                         timeout=30.0, max_en_vuelo=1000, imagenes_unicas=True):
+    """
+    Lanza peticiones a `rps` peticiones por segundo durante `duracion` segundos.
+
+    La latencia se mide desde la hora programada de cada petición, no desde que sale:
+    así incluye la espera en cola cuando el generador o el backend se saturan
+    (sin la omisión coordinada que subestimaría los percentiles).
+
+    Returns:
+        tuple: (lista de (tipo, latencia en s, estado), segundos transcurridos)
+    """
+    tipos = list(mezcla.keys())
+    pesos = [mezcla[t] for t in tipos]
+    total = int(rps * duracion)
+    registros = []
+    en_vuelo = asyncio.Semaphore(max_en_vuelo)
+    conector = aiohttp.TCPConnector(limit=max_en_vuelo)
+
+    async with aiohttp.ClientSession(connector=conector,
+                                     timeout=aiohttp.ClientTimeout(total=timeout)) as sesion:
+        async def lanzar(tipo, programado):
+            async with en_vuelo:
+                try:
+                    if tipo == "ecg":
+                        estado = await peticion_ecg(sesion, url, imagenes, archivos_por_peticion, imagenes_unicas)
+                    else:
+                        estado = await peticion_chat(sesion, url)
+                except asyncio.TimeoutError:
+                    estado = "timeout"
+                except Exception as e:
+                    # Cualquier otro fallo (conexión, respuesta que no es JSON...) cuenta como error
+                    # de esta petición sin cancelar el resto de la prueba
+                    estado = type(e).__name__
+                registros.append((tipo, time.perf_counter() - programado, estado))
+
+        tareas = []
+        t0 = time.perf_counter()
+        for i in range(total):
+            # Planificación en bucle abierto: la petición i sale en t0 + i / rps
+            programado = t0 + i / rps
+            espera = programado - time.perf_counter()
+            if espera > 0:
+                await asyncio.sleep(espera)
+            tareas.append(asyncio.create_task(lanzar(random.choices(tipos, pesos)[0], programado)))
+        await asyncio.gather(*tareas)
+        transcurrido = time.perf_counter() - t0
+
+    return registros, transcurrido
+
+
+def percentil(valores_ordenados, p):
+    """Percentil `p` (0-100) por rango más cercano de una lista ya ordenada."""
+    if not valores_ordenados:
+        return float("nan")
+    indice = max(0, min(len(valores_ordenados) - 1, math.ceil(p / 100 * len(valores_ordenados)) - 1))
+    return valores_ordenados[indice]
+
+
+def resumir(registros, transcurrido):
+    """
+    Calcula las métricas de la prueba, globales y por tipo de petición.
+
+    Returns:
+        dict: {grupo: {"peticiones", "ok", "rps", "p50_ms", "p95_ms", "p99_ms", "errores"}}
+    """
+    grupos = defaultdict(list)
+    for tipo, latencia, estado in registros:
+        grupos[tipo].append((latencia, estado))
+        grupos["total"].append((latencia, estado))
+
+    resumen = {}
+    for grupo, datos in grupos.items():
+        latencias = sorted(latencia * 1000 for latencia, _ in datos)
+        estados = Counter(estado for _, estado in datos)
+        ok = estados.pop("ok", 0)
+        resumen[grupo] = {
+            "peticiones": len(datos),
+            "ok": ok,
+            "rps": round(ok / transcurrido, 2) if transcurrido else 0.0,
+            "p50_ms": round(percentil(latencias, 50), 1),
+            "p95_ms": round(percentil(latencias, 95), 1),
+            "p99_ms": round(percentil(latencias, 99), 1),
+            "errores": dict(estados),
+        }
+    return resumen
+
+
+def imprimir_resumen(resumen, transcurrido, rps_objetivo):
+    print(f"\nDuración real: {transcurrido:.1f} s  |  RPS objetivo: {rps_objetivo}")
+    print(f"{'Grupo':<8} {'Peticiones':>10} {'OK':>8} {'RPS OK':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  Errores")
+    for grupo in sorted(resumen, key=lambda g: g == "total"):
+        r = resumen[grupo]
+        errores = ", ".join(f"{k}={v}" for k, v in r["errores"].items()) or "-"
+        print(f"{grupo:<8} {r['peticiones']:>10} {r['ok']:>8} {r['rps']:>8} "
+              f"{r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9}  {errores}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga de /analyze-ecg y /ask-chatbot.")
+    parser.add_argument("--url", default="http://127.0.0.1:5000", help="URL base del backend")
+    parser.add_argument("--rps", type=float, default=10.0, help="Peticiones por segundo objetivo")
+    parser.add_argument("--duracion", type=float, default=30.0, help="Duración de la prueba en segundos")
+    parser.add_argument("--mezcla", default="ecg=0.7,chat=0.3", help="Pesos de cada tipo de petición")
+    parser.add_argument("--imagenes", default=None, help="Carpeta con imágenes de ECG (por defecto sintéticas)")
+    parser.add_argument("--archivos-por-peticion", type=int, default=1)
+    parser.add_argument("--repetir-imagenes", action="store_true",
+                        help="Reenvía las imágenes sin modificar (mide los aciertos del historial del backend)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Timeout por petición en segundos")
+    parser.add_argument("--json", dest="salida_json", default=None, help="Guarda el resumen en este archivo")
+    args = parser.parse_args(argv)
+
+    imagenes = cargar_imagenes(args.imagenes)
+    registros, transcurrido = asyncio.run(ejecutar_carga(
+        args.url.rstrip("/"), args.rps, args.duracion, parsear_mezcla(args.mezcla), imagenes,
+        archivos_por_peticion=args.archivos_por_peticion, timeout=args.timeout,
+        imagenes_unicas=not args.repetir_imagenes,
+    ))
+    resumen = resumir(registros, transcurrido)
+    imprimir_resumen(resumen, transcurrido, args.rps)
+
+    if args.salida_json:
+        with open(args.salida_json, "w", encoding="utf-8") as f:
+            json.dump({"rps_objetivo": args.rps, "duracion_s": transcurrido, "resumen": resumen}, f,
+                      indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+Remuestreo polifásico de señales ECG a una frecuencia de muestreo canónica.
+
+Todas las etapas posteriores (limpieza, detección de picos, HRV) trabajan a FS_CANONICA,
+independientemente de la frecuencia de adquisición. Las anotaciones (índices de muestras)
+se pueden traducir de vuelta a los índices de la señal original.
+"""
+from fractions import Fraction
+from functools import lru_cache
+
+import numpy as np
+
+from lazy_imports import importacion_diferida
+
+# scipy.signal tarda en importarse: se carga en el primer remuestreo, no al arrancar la app
+signal = importacion_diferida("scipy.signal")
+
+# Frecuencia de muestreo interna (Hz) a la que se llevan todas las señales antes de limpiarlas
+FS_CANONICA = 250
+
+# Semiancho del filtro antialiasing, en muestras de la tasa máxima (igual que scipy por defecto)
+SEMIANCHO_FILTRO = 10
+
+
+@lru_cache(maxsize=64)
+def factores_remuestreo(fs_origen, fs_destino=FS_CANONICA):
+    """
+    Calcula los factores enteros (up, down) tales que fs_destino = fs_origen * up / down.
+
+    Args:
+        fs_origen (float): Frecuencia de muestreo original en Hz.
+        fs_destino (float): Frecuencia de muestreo deseada en Hz.
+
+    Returns:
+        tuple: (up, down) irreducibles.
+    """
+    razon = (Fraction(fs_destino) / Fraction(fs_origen)).limit_denominator(10000)
+    return razon.numerator, razon.denominator
+
+
+@lru_cache(maxsize=32)
+def nucleo_filtro(up, down):
+    """
+    Diseña (y cachea) el filtro FIR paso bajo antialiasing para el par (up, down).
+
+    Es el mismo filtro que `resample_poly` diseña por defecto (ventana de Kaiser, beta 5),
+    pero se calcula una sola vez por par de frecuencias en lugar de en cada llamada.
+
+    Returns:
+        np.array: Coeficientes del filtro (solo lectura).
+    """
+    tasa_max = max(up, down)
+    nucleo = signal.firwin(2 * SEMIANCHO_FILTRO * tasa_max + 1, 1.0 / tasa_max, window=("kaiser", 5.0))
+    nucleo.setflags(write=False)
+    return nucleo
+
+
+def remuestrear(senal, fs_origen, fs_destino=FS_CANONICA):
+    """
+    Remuestrea `senal` de `fs_origen` a `fs_destino` con filtrado polifásico racional.
+
+    Args:
+        senal (np.array): Señal ECG 1-D.
+        fs_origen (float): Frecuencia de muestreo de `senal` en Hz.
+        fs_destino (float): Frecuencia de muestreo de salida en Hz.
+
+    Returns:
+        np.array: Señal remuestreada (float64). Si las frecuencias coinciden se devuelve sin copiar.
+    """
+    senal = np.asarray(senal, dtype=np.float64)
+    if fs_origen == fs_destino:
+        return senal
+    up, down = factores_remuestreo(fs_origen, fs_destino)
+    # resample_poly escala el filtro en el sitio, por eso se le pasa una copia del núcleo cacheado
+    return signal.resample_poly(senal, up, down, window=nucleo_filtro(up, down).copy())
+
+
+def indices_a_origen(indices, fs_origen, n_origen=None, fs_destino=FS_CANONICA):
+    """
+    Traduce índices de muestras a `fs_destino` a los índices equivalentes a `fs_origen`.
+
+    Args:
+        indices (array-like): Índices en la señal remuestreada (puede contener NaN).
+        fs_origen (float): Frecuencia de muestreo de la señal original en Hz.
+        n_origen (int, optional): Longitud de la señal original, para acotar los índices.
+        fs_destino (float): Frecuencia de muestreo de la señal remuestreada en Hz.
+
+    Returns:
+        np.array: Índices en la señal original (int64, o float64 si había NaN).
+    """
+    indices = np.asarray(indices, dtype=np.float64)
+    originales = np.round(indices * (fs_origen / fs_destino))
+    if n_origen is not None:
+        originales = np.clip(originales, 0, n_origen - 1)
+    if np.isnan(originales).any():
+        return originales
+    return originales.astype(np.int64)
+
+
+def anotaciones_a_origen(info, fs_origen, n_origen, fs_destino=FS_CANONICA):
+    """
+    Traduce las anotaciones de `info` (NeuroKit2) a índices de la señal original.
+
+    Args:
+        info (dict): Diccionario `info` devuelto por `nk.ecg_process` a `fs_destino`.
+        fs_origen (float): Frecuencia de muestreo de la señal original en Hz.
+        n_origen (int): Longitud de la señal original.
+        fs_destino (float): Frecuencia de muestreo a la que se procesó la señal.
+
+    Returns:
+        dict: {"<clave>_Original": índices} para cada anotación de picos/ondas de `info`.
+    """
+    return {
+        f"{clave}_Original": indices_a_origen(valor, fs_origen, n_origen, fs_destino)
+        for clave, valor in info.items()
+        if clave.endswith(("_Peaks", "_Onsets", "_Offsets")) and isinstance(valor, (list, tuple, np.ndarray))
+    }
@@ -0,0 +1,156 @@
+"""
+Servicios de inferencia simulados para pruebas de carga locales del backend (app_backend.py).
+
+Levanta dos servidores HTTP con latencia y tasa de errores configurables:
+- Vertex AI:  POST /predict              -> {"predictions": [{"display_names": [...], "confidences": [...]}]}
+- OpenAI:     POST /v1/chat/completions  -> respuesta con el formato de ChatCompletion
+
+Uso:
+    python servicios_simulados.py --latencia-ms 150 --jitter-ms 50 --tasa-error 0.02
+
+y arrancar el backend apuntando a ellos:
+    VERTEX_AI_PREDICT_URL=http://127.0.0.1:8081/predict \
+    OPENAI_API_BASE=http://127.0.0.1:8082/v1 OPENAI_API_KEY=simulada \
+    gunicorn -c gunicorn.conf.py app_backend:app
+
+Requiere aiohttp.
+"""
+import argparse
+import asyncio
+import logging
+import random
+import time
+
+from aiohttp import web
+
+CLASES_SIMULADAS = ["Ritmo sinusal normal", "Fibrilación auricular", "Bloqueo AV", "Taquicardia sinusal"]
+
+
+def _middleware_simulacion(latencia_ms, jitter_ms, tasa_error):
+    """Crea un middleware que añade latencia aleatoria y errores 503 con la probabilidad indicada."""
+
+    @web.middleware
+    async def simular(request, handler):
+        retraso = max(0.0, random.gauss(latencia_ms, jitter_ms)) / 1000
+        await asyncio.sleep(retraso)
+        if random.random() < tasa_error:
+            return web.json_response({"error": "Error simulado del servicio"}, status=503)
+        return await handler(request)
+
+    return simular
+
+
+async def predecir(request):
+    """Simula `Endpoint.predict` de Vertex AI para un modelo de clasificación de imágenes."""
+    cuerpo = await request.json()
+    predicciones = []
+    for _ in cuerpo.get("instances", []):
+        confianzas = [random.random() for _ in CLASES_SIMULADAS]
+        total = sum(confianzas)
+        predicciones.append({
+            "display_names": CLASES_SIMULADAS,
+            "confidences": [c / total for c in confianzas],
+        })
+    return web.json_response({"predictions": predicciones})
+
+
+async def chat_completions(request):
+    """Simula `ChatCompletion.create` de OpenAI."""
+    cuerpo = await request.json()
+    mensajes = cuerpo.get("messages", [])
+    pregunta = mensajes[-1]["content"] if mensajes else ""
+    return web.json_response({
+        "id": f"chatcmpl-simulado-{int(time.time() * 1000)}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": cuerpo.get("model", "gpt-3.5-turbo"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": f"Respuesta simulada a: {pregunta[:200]}"},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": len(pregunta.split()), "completion_tokens": 8, "total_tokens": len(pregunta.split()) + 8},
+    })
+
+
+def crear_app_vertex(latencia_ms=150.0, jitter_ms=50.0, tasa_error=0.0):
+    """Crea la aplicación aiohttp que simula el endpoint de Vertex AI."""
+    app = web.Application(middlewares=[_middleware_simulacion(latencia_ms, jitter_ms, tasa_error)],
+                          client_max_size=64 * 1024 * 1024)
+    app.router.add_post("/predict", predecir)
+    return app
+
+
+def crear_app_openai(latencia_ms=400.0, jitter_ms=150.0, tasa_error=0.0):
+    """Crea la aplicación aiohttp que simula la API de chat de OpenAI."""
+    app = web.Application(middlewares=[_middleware_simulacion(latencia_ms, jitter_ms, tasa_error)])
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    return app
+
+
+async def iniciar_servicios(host, puerto_vertex, puerto_openai, config_vertex, config_openai):
+    """
+    Arranca ambos servicios simulados.
+
+    Returns:
+        list: Los `web.AppRunner` en ejecución (llamar a `cleanup()` para detenerlos).
+    """
+    runners = []
+    for app, puerto in ((crear_app_vertex(**config_vertex), puerto_vertex),
+                        (crear_app_openai(**config_openai), puerto_openai)):
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, puerto).start()
+        runners.append(runner)
+    logging.info(f"Servicios simulados: Vertex AI en http://{host}:{puerto_vertex}/predict, "
+                 f"OpenAI en http://{host}:{puerto_openai}/v1")
+    return runners
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servicios simulados de Vertex AI y OpenAI para pruebas de carga.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto-vertex", type=int, default=8081)
+    parser.add_argument("--puerto-openai", type=int, default=8082)
+    parser.add_argument("--latencia-ms", type=float, default=None,
+                        help="Latencia media de ambos servicios (sobrescribe los valores por servicio)")
+    parser.add_argument("--jitter-ms", type=float, default=None, help="Desviación típica de la latencia")
+    parser.add_argument("--tasa-error", type=float, default=None, help="Probabilidad de responder 503 (0-1)")
+    parser.add_argument("--latencia-vertex-ms", type=float, default=150.0)
+    parser.add_argument("--latencia-openai-ms", type=float, default=400.0)
+    parser.add_argument("--tasa-error-vertex", type=float, default=0.0)
+    parser.add_argument("--tasa-error-openai", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    config_vertex = {"latencia_ms": args.latencia_vertex_ms, "jitter_ms": args.latencia_vertex_ms / 3,
+                     "tasa_error": args.tasa_error_vertex}
+    config_openai = {"latencia_ms": args.latencia_openai_ms, "jitter_ms": args.latencia_openai_ms / 3,
+                     "tasa_error": args.tasa_error_openai}
+    for config in (config_vertex, config_openai):
+        if args.latencia_ms is not None:
+            config["latencia_ms"] = args.latencia_ms
+            config["jitter_ms"] = args.latencia_ms / 3
+        if args.jitter_ms is not None:
+            config["jitter_ms"] = args.jitter_ms
+        if args.tasa_error is not None:
+            config["tasa_error"] = args.tasa_error
+
+    logging.basicConfig(level=logging.INFO)
+
+    async def ejecutar():
+        runners = await iniciar_servicios(args.host, args.puerto_vertex, args.puerto_openai,
+                                          config_vertex, config_openai)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            for runner in runners:
+                await runner.cleanup()
+
+    try:
+        asyncio.run(ejecutar())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
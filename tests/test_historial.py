@@ -0,0 +1,64 @@
+import pytest
+
+from historial import HistorialAnalisis
+
+
+def _historial(tmp_path):
+    # Sin volcados automáticos: el test decide cuándo se escribe
+    return HistorialAnalisis(str(tmp_path / "historial.sqlite3"), tamano_lote=10_000, intervalo_s=3600)
+
+
+def _recorrer(historial, paciente_id, limite, al_pasar_pagina=None):
+    nombres, cursor = [], None
+    while True:
+        pagina = historial.historial(paciente_id, limite, cursor)
+        nombres.extend(analisis["nombre"] for analisis in pagina["analisis"])
+        cursor = pagina["siguiente"]
+        if cursor is None:
+            return nombres
+        if al_pasar_pagina is not None:
+            al_pasar_pagina()
+
+
+def test_paginas_sin_repetir_con_volcado_entre_paginas(tmp_path):
+    historial = _historial(tmp_path)
+    for i in range(30):
+        historial.registrar_analisis(f"h{i}", "senal", {"i": i}, "P1", f"n{i}")
+
+    nombres = _recorrer(historial, "P1", 4, al_pasar_pagina=historial.volcar)
+
+    assert nombres == [f"n{i}" for i in reversed(range(30))]
+    historial.cerrar()
+
+
+def test_paginas_mezclan_volcados_y_pendientes(tmp_path):
+    historial = _historial(tmp_path)
+    for i in range(10):
+        historial.registrar_analisis(f"h{i}", "senal", None, "P1", f"n{i}")
+    historial.volcar()
+    for i in range(10, 20):
+        historial.registrar_analisis(f"h{i}", "senal", None, "P1", f"n{i}")
+    historial.registrar_analisis("otro", "senal", None, "P2", "otro")
+
+    assert _recorrer(historial, "P1", 3) == [f"n{i}" for i in reversed(range(20))]
+    historial.cerrar()
+
+
+def test_guardar_datos_descarta_archivos_mayores_que_el_maximo(tmp_path):
+    historial = HistorialAnalisis(str(tmp_path / "historial.sqlite3"), max_datos_bytes=1000)
+
+    ruta = historial.guardar_datos("h1", "senal", lambda archivo: archivo.write(b"x" * 1000))
+    assert ruta == str(tmp_path / "datos" / "senal_h1.npz")
+    assert (tmp_path / "datos" / "senal_h1.npz").read_bytes() == b"x" * 1000
+    assert historial.guardar_datos("h2", "imagen_http:http://x/y", lambda archivo: archivo.write(b"x" * 1001)) is None
+    assert sorted(p.name for p in (tmp_path / "datos").iterdir()) == ["senal_h1.npz"]
+    historial.cerrar()
+
+
+def test_historial_requiere_paciente(tmp_path):
+    historial = _historial(tmp_path)
+    historial.registrar_analisis("h1", "senal", None, "P1", "n1")
+
+    with pytest.raises(ValueError):
+        historial.historial(None)
+    historial.cerrar()
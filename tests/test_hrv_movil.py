@@ -0,0 +1,41 @@
+import numpy as np
+
+from hrv_movil import HRVMovil, tendencia_hrv
+
+# Frecuencia y paso potencias de dos: los instantes de los picos y los fines de ventana son exactos
+FS = 128
+PASO_S = 1 / FS
+METRICAS = ["HRV_MeanHR", "HRV_MeanNN", "HRV_SDNN", "HRV_RMSSD", "HRV_pNN50"]
+
+
+def _picos(n_latidos=200, semilla=0):
+    rng = np.random.default_rng(semilla)
+    return np.cumsum(rng.integers(80, 150, size=n_latidos))
+
+
+def test_hrv_movil_coincide_con_tendencia():
+    picos = _picos()
+    ventana_s = 20
+    tendencia = tendencia_hrv(picos, FS, ventana_s, PASO_S)
+    hrv = HRVMovil(ventana_s)
+
+    comparados = 0
+    for pico in picos:
+        metricas = hrv.agregar_latido(pico / FS)
+        # Ventana de la tendencia que termina exactamente en este pico
+        k = round((pico / FS - tendencia["Tiempo (s)"][0]) / PASO_S) if len(tendencia["Tiempo (s)"]) else -1
+        if k < 0:
+            continue
+        assert tendencia["Tiempo (s)"][k] == pico / FS
+        for clave in METRICAS:
+            np.testing.assert_allclose(metricas[clave], tendencia[clave][k], rtol=1e-9, equal_nan=True)
+        comparados += 1
+    assert comparados > 100
+
+
+def test_tendencia_vacia_si_la_ventana_no_cabe():
+    picos = _picos(n_latidos=10)
+    duracion = (picos[-1] - picos[0]) / FS
+
+    assert len(tendencia_hrv(picos, FS, duracion + 1)["Tiempo (s)"]) == 0
+    assert len(tendencia_hrv(picos, FS, duracion / 2, 1)["Tiempo (s)"]) > 0